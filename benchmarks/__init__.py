@@ -0,0 +1 @@
+"""Benchmark suite for the proof pipeline; see the Benchmarks section of the README."""
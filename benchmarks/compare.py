@@ -0,0 +1,52 @@
+import argparse
+import json
+import sys
+from typing import Any, Dict
+
+
+def load(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(base: Dict[str, Any], head: Dict[str, Any], threshold: float) -> int:
+    """Print median changes per scenario and stage; returns how many regressed beyond threshold."""
+    base_scenarios = {scenario["name"]: scenario for scenario in base["scenarios"]}
+    regressions = 0
+    print(f"{'scenario':<36} {'stage':<22} {base['revision']:>12} {head['revision']:>12} {'change':>8}")
+    for scenario in head["scenarios"]:
+        base_scenario = base_scenarios.get(scenario["name"])
+        if base_scenario is None:
+            continue
+        for stage, summary in scenario["stages"].items():
+            base_summary = base_scenario["stages"].get(stage)
+            if base_summary is None:
+                continue
+            before, after = base_summary["median"], summary["median"]
+            change = (after - before) / before if before > 0 else 0.0
+            flag = ""
+            if change > threshold:
+                flag = "  slower"
+                regressions += 1
+            elif change < -threshold:
+                flag = "  faster"
+            print(f"{scenario['name']:<36} {stage:<22} {before * 1000:>10.1f}ms {after * 1000:>10.1f}ms {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    parser.add_argument("base", help="Results from the baseline commit")
+    parser.add_argument("head", help="Results from the commit under test")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="Relative median change reported as a regression or improvement")
+    parser.add_argument("--fail-on-regression", action="store_true",
+                        help="Exit non-zero when any stage is slower by more than the threshold")
+    args = parser.parse_args(argv)
+
+    regressions = compare(load(args.base), load(args.head), args.threshold)
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
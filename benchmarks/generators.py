@@ -0,0 +1,210 @@
+import io
+import json
+import os
+import random
+import zipfile
+from array import array
+from typing import Any, Dict, Iterator, List, Optional
+
+from my_proof.proof_of_quality_n_authenticity import VALID_ATTRIBUTES, VALID_CATEGORIES, VALID_CHAINS
+
+INVALID_CHAINS = ["bitcoin", "dogechain", "unknown-chain", ""]
+INVALID_CATEGORIES = ["Other", "NFT", ""]
+INVALID_ATTRIBUTES = ["to-the-moon", "trust-me"]
+
+ANALYSIS_WORDS = (
+    "token liquidity volume holders whale accumulation distribution contract audit supply market cap "
+    "price action momentum support resistance breakout chain bridge staking yield governance treasury "
+    "volatility risk sentiment listing exchange inflow outflow wallet concentration unlock vesting"
+).split()
+
+# Key indexes below this belong to the history pool; fresh submission tokens are numbered above it
+FRESH_KEY_OFFSET = 10 ** 12
+
+
+def token_contract(chain: str, key_index: int) -> str:
+    if chain == "solana":
+        # base58-looking, case-sensitive address
+        return f"So1{key_index:040d}".translate(str.maketrans("0", "A"))
+    return f"0x{key_index:040x}"
+
+
+def generate_metrics(rng: random.Random, authentic: bool) -> Dict[str, Any]:
+    price = round(rng.lognormvariate(0, 3), 8)
+    supply = round(rng.uniform(1e5, 1e10), 2)
+    market_cap = price * supply * rng.uniform(0.97, 1.03)
+    volatility = round(rng.uniform(0, 60), 2)
+    if not authentic:
+        # Either the market cap disagrees with price * supply or volatility is out of range
+        if rng.random() < 0.5:
+            market_cap *= rng.choice([0.5, 2.0])
+        else:
+            volatility = round(rng.uniform(101, 300), 2)
+    risk_score = rng.randint(0, 10)
+    return {
+        "name": f"Token {rng.randrange(10 ** 6)}",
+        "symbol": f"t{rng.randrange(10 ** 4)}",
+        "price": price,
+        "marketCap": round(market_cap),
+        "priceChange24h": round(rng.uniform(-30, 30), 4),
+        "volume24h": round(rng.uniform(1e3, 1e9)),
+        "circulatingSupply": supply,
+        "volatility24h": volatility,
+        "riskScore": risk_score,
+        "securityStatus": "High Risk" if risk_score > 7 else "Low Risk",
+    }
+
+
+def generate_analysis(rng: random.Random, length: int) -> str:
+    words = []
+    size = 0
+    while size < length:
+        word = rng.choice(ANALYSIS_WORDS)
+        words.append(word)
+        size += len(word) + 1
+    return " ".join(words)[:length]
+
+
+def generate_token(
+    rng: random.Random,
+    key_index: int,
+    invalid_ratio: float = 0.1,
+    analysis_chars: int = 2000,
+) -> Dict[str, Any]:
+    """One submitted token; key_index alone decides its (chain, contract) key."""
+    # Seeded by the key so every occurrence of a key lands on the same chain
+    key_rng = random.Random(key_index)
+    chain = key_rng.choice(sorted(VALID_CHAINS)) if key_rng.random() >= invalid_ratio else key_rng.choice(INVALID_CHAINS)
+    valid = rng.random() >= invalid_ratio
+    token = {"token_metadata": {"contract": token_contract(chain, key_index), "chain": chain}}
+
+    valid_attributes = sorted(VALID_ATTRIBUTES)
+    attribute_pool = valid_attributes if valid else valid_attributes + INVALID_ATTRIBUTES
+    token["token_metadata"]["metrics"] = generate_metrics(rng, authentic=rng.random() >= invalid_ratio)
+    token.update({
+        "reason_recommend": generate_analysis(rng, 40),
+        "recommendationAttributes": rng.sample(attribute_pool, rng.randint(0, 3)),
+        "recommendation_time": "2025-02-28T05:11:33.718Z",
+        "suggestion": generate_analysis(rng, 40),
+        "suggestionAttributes": rng.sample(attribute_pool, rng.randint(0, 3)),
+        "on_chain_analysis": generate_analysis(rng, analysis_chars),
+        "tokenCategory": rng.choice(sorted(VALID_CATEGORIES)) if valid else rng.choice(INVALID_CATEGORIES),
+    })
+    return token
+
+
+def iter_submission_tokens(
+    tokens: int,
+    history_keys: int = 0,
+    history_overlap: float = 0.2,
+    duplicate_ratio: float = 0.1,
+    invalid_ratio: float = 0.1,
+    analysis_chars: int = 2000,
+    seed: int = 0,
+) -> Iterator[Dict[str, Any]]:
+    """
+    The tokens of a submission, one at a time.
+
+    About history_overlap of them reuse keys from the history pool, and about
+    duplicate_ratio repeat a key already used earlier in the submission. Only
+    the keys used so far are kept, so a million-token submission can be
+    written without holding its analysis texts in memory.
+    """
+    rng = random.Random(seed)
+    submitted = array("q")
+    for position in range(tokens):
+        roll = rng.random()
+        if submitted and roll < duplicate_ratio:
+            key_index = rng.choice(submitted)
+        elif history_keys and roll < duplicate_ratio + history_overlap:
+            key_index = rng.randrange(history_keys)
+        else:
+            key_index = FRESH_KEY_OFFSET + position
+        submitted.append(key_index)
+        yield generate_token(rng, key_index, invalid_ratio, analysis_chars)
+
+
+def generate_submission(
+    tokens: int,
+    history_keys: int = 0,
+    history_overlap: float = 0.2,
+    duplicate_ratio: float = 0.1,
+    invalid_ratio: float = 0.1,
+    analysis_chars: int = 2000,
+    user_address: Optional[str] = None,
+    seed: int = 0,
+    stream: bool = False,
+) -> Dict[str, Any]:
+    """
+    A submission of `tokens` tokens; see iter_submission_tokens.
+
+    With stream=True its "tokens" is an iterator that write_submission
+    consumes as it writes, instead of a list.
+    """
+    token_iter = iter_submission_tokens(tokens, history_keys, history_overlap, duplicate_ratio, invalid_ratio,
+                                        analysis_chars, seed)
+    return {"tokens": token_iter if stream else list(token_iter), "userAddress": user_address or "0x" + "0" * 40}
+
+
+def generate_history_file(file_index: int, tokens_per_file: int, seed: int = 0) -> Dict[str, Any]:
+    """One historical submission holding keys [file_index * tokens_per_file, ...) of the history pool."""
+    rng = random.Random(f"{seed}-{file_index}")
+    first_key = file_index * tokens_per_file
+    return {"tokens": [
+        generate_token(rng, key_index, invalid_ratio=0.0, analysis_chars=200)
+        for key_index in range(first_key, first_key + tokens_per_file)
+    ]}
+
+
+def write_submission(submission: Dict[str, Any], input_dir: str, author: Optional[str] = None) -> None:
+    """Write tokenInput.json one token at a time, so "tokens" may be an iterator."""
+    os.makedirs(input_dir, exist_ok=True)
+    with open(os.path.join(input_dir, "tokenInput.json"), "w") as f:
+        f.write('{"tokens": [')
+        for position, token in enumerate(submission["tokens"]):
+            if position:
+                f.write(", ")
+            json.dump(token, f)
+        f.write("]")
+        for key, value in submission.items():
+            if key != "tokens":
+                f.write(f", {json.dumps(key)}: {json.dumps(value)}")
+        f.write("}")
+    if author:
+        with open(os.path.join(input_dir, "author.txt"), "w") as f:
+            f.write(f"author: {author}\n")
+
+
+def write_history(
+    history_dir: str,
+    files: int,
+    tokens_per_file: int,
+    passphrase: str,
+    seed: int = 0,
+) -> List[Dict[str, Any]]:
+    """
+    Encrypt synthetic historical files into history_dir as the file host would serve them.
+
+    Alternate files are ZIP archives, as real submissions may be. Returns the
+    file mappings (fileId and file name) in the order get_file_mappings would.
+    """
+    from my_proof.history_fetcher import get_gpg
+
+    os.makedirs(history_dir, exist_ok=True)
+    gpg = get_gpg()
+    mappings = []
+    for file_index in range(files):
+        raw = json.dumps(generate_history_file(file_index, tokens_per_file, seed)).encode("utf-8")
+        if file_index % 2:
+            buffer = io.BytesIO()
+            with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zip_ref:
+                zip_ref.writestr(f"history-{file_index}.json", raw)
+            raw = buffer.getvalue()
+        encrypted = gpg.encrypt(raw, recipients=None, symmetric="AES256", passphrase=passphrase, armor=False)
+        if not encrypted.ok:
+            raise RuntimeError(f"Failed to encrypt history file {file_index}: {encrypted.status}")
+        file_name = f"history-{file_index:05d}.gpg"
+        with open(os.path.join(history_dir, file_name), "wb") as f:
+            f.write(encrypted.data)
+        mappings.append({"fileId": 1_000_000 + file_index, "fileName": file_name})
+    return mappings
@@ -0,0 +1,197 @@
+import argparse
+import contextlib
+import itertools
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List
+from unittest import mock
+
+from benchmarks.generators import generate_submission, write_history, write_submission
+from benchmarks.stand_ins import LocalFileHost, LocalRedis
+from my_proof import proof_of_uniqueness
+from my_proof.input_manifest import InputManifest
+from my_proof.proof import Proof
+from my_proof.proof_of_ownership import verify_ownership
+from my_proof.proof_of_quality_n_authenticity import final_scores
+from my_proof.proof_of_uniqueness import uniqueness_details
+from my_proof.resources import HistoryCache, ProofResources
+from my_proof.signature_recovery import recovery_cache
+
+RESULTS_VERSION = 1
+# Throwaway key that signs FIXED_MESSAGE so ownership verification succeeds as it would in production
+BENCHMARK_PRIVATE_KEY = "0x" + "42" * 32
+
+
+def sign_fixed_message():
+    """Set SIGNATURE to a signature of FIXED_MESSAGE and return the signing address."""
+    from eth_account import Account
+    from eth_account.messages import encode_defunct
+
+    message_text = os.environ.get("FIXED_MESSAGE", "Please sign to retrieve your encryption key")
+    account = Account.from_key(BENCHMARK_PRIVATE_KEY)
+    signed = account.sign_message(encode_defunct(text=message_text))
+    os.environ["SIGNATURE"] = "0x" + signed.signature.hex().removeprefix("0x")
+    return account.address.lower()
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def summarize(seconds: List[float]) -> Dict[str, Any]:
+    return {
+        "runs": seconds,
+        "min": min(seconds),
+        "median": statistics.median(seconds),
+        "mean": statistics.fmean(seconds),
+    }
+
+
+def timed(call: Callable[[], Any]):
+    started = time.perf_counter()
+    result = call()
+    return time.perf_counter() - started, result
+
+
+def new_resources(redis_latency: float, session) -> ProofResources:
+    """Cold caches for every run, as a one-shot proof container would have."""
+    redis_client = LocalRedis(latency=redis_latency)
+    return ProofResources(session=session, history_cache=HistoryCache(), redis_client_factory=lambda: redis_client)
+
+
+def run_scenario(args, tokens: int, history_files: int, work_dir: str, wallet_address: str) -> Dict[str, Any]:
+    from my_proof.history_fetcher import create_session
+
+    name = f"tokens={tokens},history_files={history_files}"
+    logging.warning(f"Benchmarking {name}")
+    input_dir = os.path.join(work_dir, "input")
+    history_dir = os.path.join(work_dir, "history")
+
+    mappings = write_history(history_dir, history_files, args.tokens_per_file, os.environ["SIGNATURE"], seed=args.seed)
+    submission = generate_submission(
+        tokens,
+        history_keys=history_files * args.tokens_per_file,
+        history_overlap=args.history_overlap,
+        duplicate_ratio=args.duplicate_ratio,
+        invalid_ratio=args.invalid_ratio,
+        analysis_chars=args.analysis_chars,
+        user_address=wallet_address,
+        seed=args.seed,
+        stream=True,
+    )
+    write_submission(submission, input_dir, author=wallet_address)
+    input_bytes = os.path.getsize(os.path.join(input_dir, "tokenInput.json"))
+    del submission
+
+    stages: Dict[str, List[float]] = {name: [] for name in (
+        "parse_input", "uniqueness_details", "final_scores", "verify_ownership", "proof_generate", "proof_generate_warm")}
+    config = {"dlp_id": 31, "input_dir": input_dir}
+    session = create_session()
+
+    with LocalFileHost(history_dir) as file_host, \
+            mock.patch.object(proof_of_uniqueness, "get_file_mappings",
+                              return_value=[{"fileId": m["fileId"], "fileUrl": file_host.url(m["fileName"])} for m in mappings]), \
+            mock.patch.object(proof_of_uniqueness, "open_global_token_index", return_value=None), \
+            open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(args.repeat):
+            seconds, manifest = timed(lambda: InputManifest.scan(input_dir))
+            stages["parse_input"].append(seconds)
+
+            seconds, details = timed(lambda: uniqueness_details(wallet_address, manifest, new_resources(args.redis_latency, session)))
+            stages["uniqueness_details"].append(seconds)
+
+            unique_tokens, uniqueness_index = details["unique_json_data"], details["uniqueness_index"]
+            # Bound as defaults, so the del below releases them before the next repeat
+            seconds, _ = timed(lambda tokens=unique_tokens, index=uniqueness_index: final_scores(tokens, index))
+            stages["final_scores"].append(seconds)
+
+            # Every stage measures a cold container, which has not recovered the signature yet
+            recovery_cache.clear()
+            seconds, _ = timed(lambda: verify_ownership(manifest))
+            stages["verify_ownership"].append(seconds)
+
+            resources = new_resources(args.redis_latency, session)
+            recovery_cache.clear()
+            seconds, response = timed(lambda: Proof(config, InputManifest.scan(input_dir), resources).generate())
+            stages["proof_generate"].append(seconds)
+
+            # Same resources again: history served from the in-process and Redis caches
+            seconds, _ = timed(lambda: Proof(config, InputManifest.scan(input_dir), resources).generate())
+            stages["proof_generate_warm"].append(seconds)
+            del details, unique_tokens, uniqueness_index
+    session.close()
+
+    return {
+        "name": name,
+        "parameters": {"tokens": tokens, "history_files": history_files, "input_bytes": input_bytes},
+        "outcome": {"valid": response.valid, "score": response.score, "uniqueness": response.uniqueness,
+                    "ownership": response.ownership},
+        "stages": {stage: summarize(seconds) for stage, seconds in stages.items()},
+        # Per-file download, decrypt and parse cost inside the last cold Proof.generate
+        "operations": (response.attributes or {}).get("timings", {}).get("operations", {}),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark proof generation on synthetic submissions and histories.")
+    parser.add_argument("--tokens", type=int, nargs="+", default=[10, 1000, 10000],
+                        help="Submission sizes to benchmark, in tokens")
+    parser.add_argument("--history-files", type=int, nargs="+", default=[0, 10, 100],
+                        help="Numbers of historical files to benchmark against")
+    parser.add_argument("--tokens-per-file", type=int, default=50, help="Tokens in each historical file")
+    parser.add_argument("--history-overlap", type=float, default=0.2,
+                        help="Fraction of submitted tokens already present in the history")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.1,
+                        help="Fraction of submitted tokens repeating an earlier token of the same submission")
+    parser.add_argument("--invalid-ratio", type=float, default=0.1,
+                        help="Fraction of tokens with an invalid chain, category or inconsistent metrics")
+    parser.add_argument("--analysis-chars", type=int, default=2000, help="Length of each on_chain_analysis text")
+    parser.add_argument("--redis-latency", type=float, default=0.0005,
+                        help="Simulated Redis round-trip time in seconds")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per scenario")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark-results.json", help="Where to write the results JSON")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format="%(message)s")
+    wallet_address = sign_fixed_message()
+
+    scenarios = []
+    for tokens, history_files in itertools.product(args.tokens, args.history_files):
+        with tempfile.TemporaryDirectory() as work_dir:
+            scenarios.append(run_scenario(args, tokens, history_files, work_dir, wallet_address))
+
+    results = {
+        "version": RESULTS_VERSION,
+        "revision": git_revision(),
+        "created": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "parameters": {key: value for key, value in vars(args).items() if key != "output"},
+        "scenarios": scenarios,
+    }
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    for scenario in scenarios:
+        medians = ", ".join(f"{stage} {summary['median'] * 1000:.1f}ms" for stage, summary in scenario["stages"].items())
+        print(f"{scenario['name']}: {medians}")
+    print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
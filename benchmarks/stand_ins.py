@@ -0,0 +1,176 @@
+import functools
+import os
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+
+class LocalRedis:
+    """
+    In-memory stand-in for the redis-py client, covering the commands the proof uses.
+
+    Values are stored as strings, as with decode_responses=True. Every command
+    and every pipeline execute() costs one simulated round trip of `latency` seconds.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self._values: Dict[str, Any] = {}
+        self._expiry: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _round_trip(self) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _live(self, key: str) -> bool:
+        expires = self._expiry.get(key)
+        if expires is not None and expires <= time.time():
+            self._values.pop(key, None)
+            self._expiry.pop(key, None)
+        return key in self._values
+
+    # Commands without the round trip, shared by the client and its pipelines
+    def _get(self, key):
+        return self._values[key] if self._live(key) else None
+
+    def _set(self, key, value, ex=None):
+        self._values[key] = str(value)
+        if ex is not None:
+            self._expiry[key] = time.time() + ex
+        else:
+            self._expiry.pop(key, None)
+        return True
+
+    def _hget(self, key, field):
+        return self._values[key].get(field) if self._live(key) and isinstance(self._values[key], dict) else None
+
+    def _hset(self, key, field, value):
+        self._values.setdefault(key, {})[field] = str(value)
+        return 1
+
+    def _expire(self, key, seconds):
+        if not self._live(key):
+            return False
+        self._expiry[key] = time.time() + seconds
+        return True
+
+    def _delete(self, *keys):
+        removed = 0
+        for key in keys:
+            if self._live(key):
+                del self._values[key]
+                self._expiry.pop(key, None)
+                removed += 1
+        return removed
+
+    def _zset(self, key) -> Dict[str, float]:
+        if not self._live(key):
+            self._values[key] = {}
+        return self._values[key]
+
+    def _zadd(self, key, mapping):
+        zset = self._zset(key)
+        added = sum(1 for member in mapping if member not in zset)
+        zset.update({member: float(score) for member, score in mapping.items()})
+        return added
+
+    def _zrem(self, key, *members):
+        zset = self._zset(key)
+        return sum(1 for member in members if zset.pop(member, None) is not None)
+
+    def _zrange(self, key, start, end):
+        members = sorted(self._zset(key).items(), key=lambda item: (item[1], item[0]))
+        end = len(members) if end == -1 else end + 1
+        return [member for member, _ in members[start:end]]
+
+    def _zremrangebyscore(self, key, minimum, maximum):
+        zset = self._zset(key)
+        stale = [member for member, score in zset.items() if float(minimum) <= score <= float(maximum)]
+        for member in stale:
+            del zset[member]
+        return len(stale)
+
+    def _zcard(self, key):
+        return len(self._zset(key))
+
+    def __getattr__(self, name):
+        command = getattr(type(self), f"_{name}", None)
+        if command is None:
+            raise AttributeError(name)
+
+        @functools.wraps(command)
+        def call(*args, **kwargs):
+            self._round_trip()
+            with self._lock:
+                return command(self, *args, **kwargs)
+        return call
+
+    def ping(self) -> bool:
+        self._round_trip()
+        return True
+
+    def pipeline(self, transaction: bool = True) -> "LocalPipeline":
+        return LocalPipeline(self)
+
+    def close(self) -> None:
+        pass
+
+
+class LocalPipeline:
+    """Queues LocalRedis commands and runs them in a single round trip."""
+
+    def __init__(self, client: LocalRedis):
+        self.client = client
+        self._commands = []
+
+    def __getattr__(self, name):
+        command = getattr(LocalRedis, f"_{name}", None)
+        if command is None:
+            raise AttributeError(name)
+
+        def queue(*args, **kwargs):
+            self._commands.append((command, args, kwargs))
+            return self
+        return queue
+
+    def execute(self, raise_on_error: bool = True):
+        self.client._round_trip()
+        replies = []
+        with self.client._lock:
+            for command, args, kwargs in self._commands:
+                try:
+                    replies.append(command(self.client, *args, **kwargs))
+                except Exception as e:
+                    if raise_on_error:
+                        raise
+                    replies.append(e)
+        self._commands = []
+        return replies
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class LocalFileHost:
+    """Serves a directory over HTTP on localhost, standing in for the file host of historical submissions."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def __enter__(self) -> "LocalFileHost":
+        handler = functools.partial(_QuietHandler, directory=self.directory)
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def url(self, file_name: str) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}/{os.path.basename(file_name)}"
@@ -1,10 +1,14 @@
+import argparse
 import json
 import logging
 import os
 import sys
 import traceback
-import zipfile
 from typing import Dict, Any
+from my_proof.deadline import Deadline
+from my_proof.input_manifest import InputManifest
+from my_proof.instrumentation import StageTimings
+from my_proof.log_utils import configure_logging
 from my_proof.proof import Proof
 
 # Default to 'production' if NODE_ENV is not set
@@ -15,7 +19,7 @@ INPUT_DIR = './demo/input' if environment == 'development' else '/input'
 OUTPUT_DIR = './demo/output' if environment == 'development' else '/output'
 SEALED_DIR = './demo/sealed' if environment == 'development' else '/sealed'
 
-logging.basicConfig(level=logging.INFO, format='%(message)s')
+configure_logging()
 
 def load_config() -> Dict[str, Any]:
     """Load proof configuration from environment variables."""
@@ -41,36 +45,60 @@ def load_config() -> Dict[str, Any]:
 
 def run() -> None:
     """Generate proofs for all input files."""
+    # The time budget covers the whole run, input parsing included
+    deadline = Deadline.from_env()
     config = load_config()
-    input_files_exist = os.path.isdir(INPUT_DIR) and bool(os.listdir(INPUT_DIR))
+    timings = StageTimings()
+    input_filenames = os.listdir(INPUT_DIR) if os.path.isdir(INPUT_DIR) else []
 
-    if not input_files_exist:
+    if not input_filenames:
         raise FileNotFoundError(f"No input files found in {INPUT_DIR}")
-    extract_input()
 
-    proof = Proof(config)
+    # Scan and parse the input once, reading ZIP members in place; every proof stage reads from the manifest
+    with timings.stage("parse_input"):
+        manifest = InputManifest(INPUT_DIR, input_filenames)
+    proof = Proof(config, manifest, timings=timings, deadline=deadline)
     proof_response = proof.generate()
 
     output_path = os.path.join(OUTPUT_DIR, "results.json")
     with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(proof_response.model_dump(), f, indent=2)
-    logging.info(f"Proof generation complete: {proof_response}")
+        f.write(proof_response.to_json())
+    # Stage metrics for scraping, next to the results
+    timings.write(OUTPUT_DIR)
+    # The full response holds per-token metadata, so only the summary is logged
+    logging.info("Proof generation complete: valid=%s score=%s, %d tokens scored", proof_response.valid,
+                 proof_response.score, len(proof_response.metadata.get("metadata", [])))
 
 
-def extract_input() -> None:
-    """
-    If the input directory contains any zip files, extract them
-    :return:
-    """
-    for input_filename in os.listdir(INPUT_DIR):
-        input_file = os.path.join(INPUT_DIR, input_filename)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a proof of contribution for the input directory.")
+    parser.add_argument("--startup-profile", action="store_true",
+                        help="Report import-time cost of a proof run and exit non-zero if it exceeds STARTUP_IMPORT_BUDGET_MS")
+    parser.add_argument("--batch", nargs="+", metavar="SUBMISSION",
+                        help="Prove many submission directories or ZIP archives; results are written to the output directory")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Number of worker processes for --batch (defaults to BATCH_WORKERS or the CPU count)")
+    parser.add_argument("--serve", action="store_true",
+                        help="Run a long-lived proof service instead of a one-shot proof")
+    parser.add_argument("--host", default="127.0.0.1", help="Address for --serve to listen on")
+    parser.add_argument("--port", type=int, default=8000, help="Port for --serve to listen on")
+    parser.add_argument("--socket", metavar="PATH", help="Unix socket for --serve, instead of --host/--port")
+    args = parser.parse_args()
 
-        if zipfile.is_zipfile(input_file):
-            with zipfile.ZipFile(input_file, 'r') as zip_ref:
-                zip_ref.extractall(INPUT_DIR)
+    if args.startup_profile:
+        from my_proof.startup_profile import main as startup_profile_main
+        sys.exit(startup_profile_main())
 
+    if args.serve:
+        from my_proof.service import serve
+        serve(load_config(), host=args.host, port=args.port, socket_path=args.socket)
+        sys.exit(0)
+
+    if args.batch:
+        from my_proof.batch import BATCH_WORKERS, run_batch
+        summary = run_batch(args.batch, load_config(), OUTPUT_DIR, args.workers or BATCH_WORKERS)
+        sys.exit(1 if summary["failed"] else 0)
 
-if __name__ == "__main__":
     try:
         run()
     except Exception as e:
@@ -0,0 +1,114 @@
+import json
+import logging
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from my_proof.input_manifest import InputManifest
+from my_proof.instrumentation import StageTimings
+from my_proof.proof import Proof
+from my_proof.resources import ProofResources
+
+BATCH_WORKERS = int(os.environ.get("BATCH_WORKERS", os.cpu_count() or 1))
+
+# Warm state of the current worker process, created once by _init_worker
+_worker_resources: Optional[ProofResources] = None
+
+
+def prepare_submission(path: str) -> InputManifest:
+    """
+    Build the manifest for one submission directory or ZIP archive.
+
+    Archives are read in place, so the submission is never extracted or modified.
+    """
+    if os.path.isdir(path):
+        return InputManifest(path, os.listdir(path))
+    return InputManifest(os.path.dirname(path), [os.path.basename(path)])
+
+
+def _init_worker() -> None:
+    global _worker_resources
+    _worker_resources = ProofResources.create()
+
+
+def _output_name(index: int, path: str) -> str:
+    stem = os.path.splitext(os.path.basename(os.path.normpath(path)))[0]
+    return f"results-{index:05d}-{stem}.json"
+
+
+def prove_submission(index: int, path: str, config: Dict[str, Any], output_dir: str) -> Dict[str, Any]:
+    """Generate and write the ProofResponse for one submission."""
+    started = time.perf_counter()
+    output_path = os.path.join(output_dir, _output_name(index, path))
+    try:
+        timings = StageTimings()
+        with timings.stage("parse_input"):
+            manifest = prepare_submission(path)
+        proof = Proof({**config, 'input_dir': manifest.input_dir, 'file_id': None}, manifest, _worker_resources, timings)
+        proof_response = proof.generate()
+
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(proof_response.to_json())
+        return {
+            "submission": path,
+            "output": output_path,
+            "valid": proof_response.valid,
+            "score": proof_response.score,
+            "seconds": time.perf_counter() - started,
+        }
+    except Exception as e:
+        logging.error(f"Error during proof generation for {path}: {e}")
+        traceback.print_exc()
+        return {"submission": path, "error": str(e), "seconds": time.perf_counter() - started}
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def run_batch(paths: List[str], config: Dict[str, Any], output_dir: str, max_workers: int = BATCH_WORKERS) -> Dict[str, Any]:
+    """
+    Prove many submissions across a process pool.
+
+    Each worker creates its Redis client, HTTP session, gpg context and history
+    cache once and reuses them for every submission it handles. One results
+    file is written per submission, plus batch-summary.json with throughput.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    started = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=max(1, max_workers), initializer=_init_worker) as executor:
+        futures = [
+            executor.submit(prove_submission, index, path, config, output_dir)
+            for index, path in enumerate(paths)
+        ]
+        results = [future.result() for future in futures]
+
+    wall_seconds = time.perf_counter() - started
+    latencies = sorted(result["seconds"] for result in results)
+    failed = [result for result in results if "error" in result]
+    summary = {
+        "submissions": len(results),
+        "succeeded": len(results) - len(failed),
+        "failed": len(failed),
+        "workers": max_workers,
+        "wall_seconds": wall_seconds,
+        "proofs_per_second": len(results) / wall_seconds if wall_seconds > 0 else 0.0,
+        "latency_seconds": {
+            "mean": sum(latencies) / len(latencies) if latencies else 0.0,
+            "p50": _percentile(latencies, 0.5),
+            "p95": _percentile(latencies, 0.95),
+            "max": latencies[-1] if latencies else 0.0,
+        },
+        "results": results,
+    }
+
+    with open(os.path.join(output_dir, "batch-summary.json"), 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2)
+    logging.info(f"Batch complete: {summary['succeeded']}/{summary['submissions']} proofs in {wall_seconds:.2f}s "
+                 f"({summary['proofs_per_second']:.2f} proofs/s)")
+    return summary
@@ -0,0 +1,221 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from contextlib import suppress
+from typing import Any, BinaryIO, Dict, Optional
+
+from my_proof.deadline import Deadline, DeadlineReader
+from my_proof.file_lock import directory_lock
+
+BLOB_CACHE_DIR = os.environ.get("BLOB_CACHE_DIR")
+BLOB_CACHE_MAX_BYTES = int(os.environ.get("BLOB_CACHE_MAX_BYTES", 1024 ** 3))
+# Entries validated this recently are served without asking the server
+BLOB_CACHE_REVALIDATE_AFTER = float(os.environ.get("BLOB_CACHE_REVALIDATE_AFTER", 3600))
+
+OBJECTS_DIR = "objects"
+REFS_DIR = "refs"
+
+
+class BlobCache:
+    """
+    On-disk cache of downloaded encrypted history files.
+
+    Blobs are stored once under their SHA-256, and each URL has a small ref
+    file pointing at its blob along with the ETag and Last-Modified the server
+    sent. Stale refs are revalidated with a conditional GET, so an unchanged
+    file costs a 304 instead of a download. Every read re-hashes the blob and
+    drops it on a mismatch. Ref mtimes track use, and the least recently used
+    entries are evicted once the blobs exceed max_bytes. Blobs are handed out
+    as open files, so an eviction by another thread or process never pulls a
+    file out from under its reader. Several processes can share one cache
+    directory.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = BLOB_CACHE_MAX_BYTES,
+                 revalidate_after: float = BLOB_CACHE_REVALIDATE_AFTER):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.revalidate_after = revalidate_after
+        os.makedirs(os.path.join(cache_dir, OBJECTS_DIR), exist_ok=True)
+        os.makedirs(os.path.join(cache_dir, REFS_DIR), exist_ok=True)
+
+    def _ref_path(self, url: str) -> str:
+        return os.path.join(self.cache_dir, REFS_DIR, hashlib.sha256(url.encode("utf-8")).hexdigest() + ".json")
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, OBJECTS_DIR, digest)
+
+    def _read_ref(self, url: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._ref_path(url), encoding="utf-8") as f:
+                ref = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return ref if ref.get("url") == url else None
+
+    def _write_ref(self, ref: Dict[str, Any]) -> None:
+        path = self._ref_path(ref["url"])
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(ref, f)
+        os.replace(temp_path, path)
+
+    def _open_verified(self, ref: Dict[str, Any]) -> Optional[BinaryIO]:
+        """The blob for ref, open and rewound, if it exists and its content still matches its hash."""
+        path = self._object_path(ref["sha256"])
+        digest = hashlib.sha256()
+        try:
+            blob = open(path, "rb")
+        except OSError:
+            return None
+        try:
+            for chunk in iter(lambda: blob.read(1024 * 1024), b""):
+                digest.update(chunk)
+        except OSError as e:
+            blob.close()
+            logging.warning(f"Blob cache entry for {ref['url']} could not be read, refetching: {e}")
+            return None
+        if digest.hexdigest() != ref["sha256"]:
+            blob.close()
+            logging.warning(f"Blob cache entry for {ref['url']} failed its integrity check, refetching")
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        blob.seek(0)
+        return blob
+
+    def fetch(self, http, url: str, timeout: float, deadline: Optional[Deadline] = None) -> Optional[BinaryIO]:
+        """
+        An open local copy of url, downloading or revalidating it as needed.
+
+        The caller closes the returned file. Returns None when the server
+        answers with an error status. Network errors propagate from http.get,
+        and disk errors while storing the download as OSError. A download still
+        running when the deadline passes stops with DeadlineExceeded.
+        """
+        ref = self._read_ref(url)
+        blob = self._open_verified(ref) if ref is not None else None
+        if blob is not None:
+            try:
+                os.utime(self._ref_path(url))
+            except OSError:
+                # Evicted by another process since it was read; the blob is already open
+                pass
+            if time.time() - ref["validated"] < self.revalidate_after:
+                return blob
+
+        headers = {}
+        if blob is not None and ref.get("etag"):
+            headers["If-None-Match"] = ref["etag"]
+        if blob is not None and ref.get("last_modified"):
+            headers["If-Modified-Since"] = ref["last_modified"]
+
+        try:
+            with http.get(url, headers=headers, stream=True, timeout=timeout) as response:
+                if response.status_code == 304 and blob is not None:
+                    try:
+                        self._write_ref({**ref, "validated": time.time()})
+                    except OSError as e:
+                        logging.warning(f"Blob cache ref for {url} could not be updated: {e}")
+                    return blob
+                if blob is not None:
+                    blob.close()
+                    blob = None
+                if response.status_code != 200:
+                    logging.error(f"Failed to download file: {response.status_code}")
+                    return None
+                response.raw.decode_content = True
+                body = DeadlineReader(response.raw, deadline) if deadline is not None else response.raw
+                blob = open(self._store(url, response, body), "rb")
+        except BaseException:
+            if blob is not None:
+                blob.close()
+            raise
+
+        try:
+            self._evict()
+        except OSError as e:
+            logging.warning(f"Blob cache eviction failed: {e}")
+        return blob
+
+    def _store(self, url: str, response, body) -> str:
+        digest = hashlib.sha256()
+        size = 0
+        fd, temp_path = tempfile.mkstemp(dir=os.path.join(self.cache_dir, OBJECTS_DIR), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in iter(lambda: body.read(64 * 1024), b""):
+                    digest.update(chunk)
+                    size += len(chunk)
+                    f.write(chunk)
+            path = self._object_path(digest.hexdigest())
+            # Identical content under another URL is already stored; replacing it is harmless
+            os.replace(temp_path, path)
+        except BaseException:
+            with suppress(OSError):
+                os.remove(temp_path)
+            raise
+
+        self._write_ref({
+            "url": url,
+            "sha256": digest.hexdigest(),
+            "size": size,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "validated": time.time(),
+        })
+        return path
+
+    def _evict(self) -> None:
+        """Drop least recently used refs until the blobs fit in max_bytes, then unreferenced blobs."""
+        refs_dir = os.path.join(self.cache_dir, REFS_DIR)
+        with directory_lock(self.cache_dir):
+            refs = []
+            for entry in os.scandir(refs_dir):
+                if not entry.name.endswith(".json"):
+                    continue
+                try:
+                    with open(entry.path, encoding="utf-8") as f:
+                        refs.append((entry.stat().st_mtime, entry.path, json.load(f)))
+                except (OSError, ValueError):
+                    continue
+
+            sizes = {ref["sha256"]: ref["size"] for _, _, ref in refs}
+            if sum(sizes.values()) <= self.max_bytes:
+                return
+
+            refs.sort(key=lambda item: item[0])
+            users = {}
+            for _, _, ref in refs:
+                users[ref["sha256"]] = users.get(ref["sha256"], 0) + 1
+            total = sum(sizes.values())
+            evicted = 0
+            for _, ref_path, ref in refs:
+                if total <= self.max_bytes:
+                    break
+                os.remove(ref_path)
+                evicted += 1
+                users[ref["sha256"]] -= 1
+                if users[ref["sha256"]] == 0:
+                    total -= ref["size"]
+                    try:
+                        os.remove(self._object_path(ref["sha256"]))
+                    except OSError:
+                        pass
+            logging.info(f"Evicted {evicted} entries from the blob cache")
+
+
+def open_blob_cache(cache_dir: Optional[str] = BLOB_CACHE_DIR) -> Optional[BlobCache]:
+    """Open the configured blob cache, or return None when it is disabled or unusable."""
+    if not cache_dir:
+        return None
+    try:
+        return BlobCache(cache_dir)
+    except OSError as e:
+        logging.warning(f"Blob cache unavailable, downloading without it: {e}")
+        return None
@@ -0,0 +1,75 @@
+import os
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+# Time budget for one proof, in seconds; unset means no limit
+PROOF_DEADLINE_SECONDS = os.environ.get("PROOF_DEADLINE_SECONDS")
+# Checks in per-token loops happen every this many tokens
+DEADLINE_CHECK_INTERVAL = 256
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised by reads that were cut off because the proof's deadline passed."""
+
+
+class Deadline:
+    """
+    The point in time by which a proof has to finish.
+
+    Stages take their timeouts from remaining() and stop starting new work
+    once expired() is true. Whatever they leave undone is recorded with
+    skip(), so the proof can report itself as partial and say what it covered.
+    """
+
+    def __init__(self, seconds: Optional[float] = None):
+        self.expires_at = time.monotonic() + seconds if seconds is not None else None
+        self.skipped: Dict[str, int] = Counter()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "Deadline":
+        return cls(float(PROOF_DEADLINE_SECONDS) if PROOF_DEADLINE_SECONDS else None)
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left, never negative; None when there is no deadline."""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    def timeout(self, default: float) -> float:
+        """default, shortened to the time left; used for network and subprocess timeouts."""
+        remaining = self.remaining()
+        return default if remaining is None else min(default, remaining)
+
+    def skip(self, what: str, count: int = 1) -> None:
+        """Record work left undone because the deadline passed; safe to call from worker threads."""
+        if count:
+            with self._lock:
+                self.skipped[what] += count
+
+    @property
+    def partial(self) -> bool:
+        return bool(self.skipped)
+
+
+class DeadlineReader:
+    """
+    File-like view of a stream that fails once the deadline has passed.
+
+    Network timeouts only bound each read, so a slow body can keep trickling
+    in; reading through this caps the whole transfer at the deadline.
+    """
+
+    def __init__(self, stream, deadline: Deadline):
+        self.stream = stream
+        self.deadline = deadline
+
+    def read(self, size: int = -1) -> bytes:
+        if self.deadline.expired():
+            raise DeadlineExceeded("Deadline reached while reading")
+        return self.stream.read(size)
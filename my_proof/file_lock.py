@@ -0,0 +1,22 @@
+import fcntl
+import os
+from contextlib import contextmanager
+
+# Lock file inside each directory that several processes write to
+LOCK_FILE = "lock"
+
+
+@contextmanager
+def directory_lock(directory: str, shared: bool = False):
+    """
+    Hold a lock on directory's lock file across threads and processes.
+
+    Writers take it exclusively; readers that must not see a write half done
+    take it shared. The lock is not reentrant: do not take it again inside.
+    """
+    with open(os.path.join(directory, LOCK_FILE), "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
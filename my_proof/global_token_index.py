@@ -0,0 +1,252 @@
+import hashlib
+import json
+import logging
+import math
+import os
+from typing import Iterable, List, Optional
+
+from my_proof.file_lock import directory_lock
+from my_proof.token_record import TokenKey
+
+GLOBAL_TOKEN_INDEX_DIR = os.environ.get("GLOBAL_TOKEN_INDEX_DIR")
+GLOBAL_TOKEN_INDEX_CAPACITY = int(os.environ.get("GLOBAL_TOKEN_INDEX_CAPACITY", 1_000_000))
+GLOBAL_TOKEN_INDEX_ERROR_RATE = float(os.environ.get("GLOBAL_TOKEN_INDEX_ERROR_RATE", 0.01))
+# Appended keys are merged into the sorted file once the log reaches this many entries
+GLOBAL_TOKEN_INDEX_LOG_LIMIT = int(os.environ.get("GLOBAL_TOKEN_INDEX_LOG_LIMIT", 65536))
+
+INDEX_VERSION = 1
+META_FILE = "meta.json"
+BLOOM_FILE = "bloom.bin"
+KEYS_FILE = "keys.u64"
+LOG_FILE = "keys.log"
+# Keys each submission added, so re-proving it does not count its own tokens as already submitted
+SUBMISSIONS_DIR = "submissions"
+
+
+def hash_token_key(key: TokenKey) -> int:
+    """64-bit hash of a normalized (chain, contract) key."""
+    chain, contract = key
+    digest = hashlib.blake2b(f"{chain}\x1f{contract}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def bloom_parameters(capacity: int, error_rate: float):
+    """Return (bits, hashes) for a Bloom filter of capacity items at error_rate."""
+    bits = max(64, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+    bits = (bits + 7) // 8 * 8
+    hashes = max(1, int(round(bits / capacity * math.log(2))))
+    return bits, hashes
+
+
+class GlobalTokenIndex:
+    """
+    Persistent set of every (chain, contract) ever accepted by the DLP.
+
+    Keys are stored as 64-bit hashes: a sorted, memory-mapped array plus a
+    small append-only log of recent additions, with a memory-mapped Bloom
+    filter in front so most new tokens are rejected without touching either.
+    The keys a submission added are also listed under its id, so proving the
+    same submission again (a retry, a backfill, another validator) neither
+    counts them against it nor appends them twice.
+    Lookups cost a handful of bit probes or one binary search regardless of
+    how many tokens the index holds. Writers serialize on a lock file and
+    readers load under a shared lock, so a reader never combines files from
+    before and after a compaction, and several proof processes can share one
+    index directory.
+    """
+
+    def __init__(
+        self,
+        index_dir: str,
+        capacity: int = GLOBAL_TOKEN_INDEX_CAPACITY,
+        error_rate: float = GLOBAL_TOKEN_INDEX_ERROR_RATE,
+        log_limit: int = GLOBAL_TOKEN_INDEX_LOG_LIMIT,
+    ):
+        self.index_dir = index_dir
+        self.error_rate = error_rate
+        self.log_limit = log_limit
+        os.makedirs(os.path.join(index_dir, SUBMISSIONS_DIR), exist_ok=True)
+
+        with directory_lock(self.index_dir):
+            if not os.path.exists(self._path(META_FILE)):
+                self._create(capacity)
+        with directory_lock(self.index_dir, shared=True):
+            self._load()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.index_dir, name)
+
+    def _write_meta(self, meta) -> None:
+        temp_path = self._path(META_FILE + ".tmp")
+        with open(temp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(temp_path, self._path(META_FILE))
+
+    def _create(self, capacity: int) -> None:
+        bits, hashes = bloom_parameters(capacity, self.error_rate)
+        with open(self._path(BLOOM_FILE), "wb") as f:
+            f.truncate(bits // 8)
+        open(self._path(KEYS_FILE), "wb").close()
+        open(self._path(LOG_FILE), "wb").close()
+        self._write_meta({"version": INDEX_VERSION, "capacity": capacity, "bloom_bits": bits, "bloom_hashes": hashes})
+        logging.info(f"Created global token index in {self.index_dir} ({bits // 8} byte Bloom filter)")
+
+    def _load(self, writable: bool = False) -> None:
+        """Read meta, Bloom filter, keys and log; the caller holds the directory lock."""
+        import numpy as np
+
+        with open(self._path(META_FILE)) as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported global token index version {self.meta.get('version')}")
+
+        # Only add_many writes to the Bloom filter, under the exclusive lock
+        self.bloom = np.memmap(self._path(BLOOM_FILE), dtype=np.uint8, mode="r+" if writable else "r")
+        self.sorted_keys = self._map_keys(self._path(KEYS_FILE))
+        with open(self._path(LOG_FILE), "rb") as f:
+            log_bytes = f.read()
+        # A concurrent append may leave a partial record at the end
+        log_bytes = log_bytes[:len(log_bytes) // 8 * 8]
+        self.log_keys = np.frombuffer(log_bytes, dtype="<u8")
+
+    def _submission_path(self, submission_id: str) -> str:
+        name = hashlib.sha256(str(submission_id).encode("utf-8")).hexdigest()
+        return os.path.join(self.index_dir, SUBMISSIONS_DIR, f"{name}.u64")
+
+    def recorded_by(self, submission_id: Optional[str]):
+        """Hashes of the keys this submission added to the index."""
+        import numpy as np
+
+        if submission_id is None:
+            return np.empty(0, dtype="<u8")
+        try:
+            with open(self._submission_path(submission_id), "rb") as f:
+                recorded = f.read()
+        except FileNotFoundError:
+            return np.empty(0, dtype="<u8")
+        return np.frombuffer(recorded[:len(recorded) // 8 * 8], dtype="<u8")
+
+    @staticmethod
+    def _map_keys(path: str):
+        import numpy as np
+
+        if os.path.getsize(path) == 0:
+            return np.empty(0, dtype="<u8")
+        return np.memmap(path, dtype="<u8", mode="r")
+
+    def _bloom_positions(self, hashes):
+        import numpy as np
+
+        bits = np.uint64(self.meta["bloom_bits"])
+        h1 = hashes & np.uint64(0xFFFFFFFF)
+        h2 = (hashes >> np.uint64(32)) | np.uint64(1)
+        rounds = np.arange(self.meta["bloom_hashes"], dtype=np.uint64)
+        return (h1[:, None] + rounds[None, :] * h2[:, None]) % bits
+
+    def contains_many(self, keys: List[TokenKey], submission_id: Optional[str] = None) -> List[bool]:
+        """
+        Membership for many keys at once; the Bloom filter screens out most misses.
+
+        Keys that submission_id itself added count as absent.
+        """
+        import numpy as np
+
+        if not keys:
+            return []
+        hashes = np.fromiter((hash_token_key(key) for key in keys), dtype=np.uint64, count=len(keys))
+
+        positions = self._bloom_positions(hashes)
+        probes = self.bloom[positions >> np.uint64(3)] & (np.uint8(1) << (positions & np.uint64(7)).astype(np.uint8))
+        maybe = probes.all(axis=1)
+
+        found = np.zeros(len(keys), dtype=bool)
+        candidates = hashes[maybe]
+        if len(candidates):
+            in_log = np.isin(candidates, self.log_keys)
+            slots = np.searchsorted(self.sorted_keys, candidates)
+            in_sorted = np.zeros(len(candidates), dtype=bool)
+            valid = slots < len(self.sorted_keys)
+            in_sorted[valid] = self.sorted_keys[slots[valid]] == candidates[valid]
+            found[maybe] = in_log | in_sorted
+            if submission_id is not None:
+                found[maybe] &= ~np.isin(candidates, self.recorded_by(submission_id))
+        return found.tolist()
+
+    def __contains__(self, key: TokenKey) -> bool:
+        return self.contains_many([key])[0]
+
+    def __len__(self) -> int:
+        return len(self.sorted_keys) + len(self.log_keys)
+
+    def add_many(self, keys: Iterable[TokenKey], submission_id: Optional[str] = None) -> int:
+        """Append keys not already present, crediting them to submission_id; returns how many were added."""
+        import numpy as np
+
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return 0
+
+        with directory_lock(self.index_dir):
+            # Pick up keys appended by other processes since this index was opened
+            self._load(writable=True)
+            new_keys = [key for key, present in zip(keys, self.contains_many(keys)) if not present]
+            if not new_keys:
+                return 0
+            hashes = np.fromiter((hash_token_key(key) for key in new_keys), dtype=np.uint64, count=len(new_keys))
+
+            # Set the Bloom bits before the log append so readers never see a key the filter would reject
+            positions = self._bloom_positions(hashes).ravel()
+            np.bitwise_or.at(self.bloom, positions >> np.uint64(3), (np.uint8(1) << (positions & np.uint64(7)).astype(np.uint8)))
+            self.bloom.flush()
+            with open(self._path(LOG_FILE), "ab") as f:
+                f.write(hashes.astype("<u8").tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            self.log_keys = np.concatenate([self.log_keys, hashes.astype("<u8")])
+            if submission_id is not None:
+                with open(self._submission_path(submission_id), "ab") as f:
+                    f.write(hashes.astype("<u8").tobytes())
+
+            if len(self.log_keys) >= self.log_limit:
+                self._compact()
+        return len(new_keys)
+
+    def _compact(self) -> None:
+        """Merge the log into the sorted file, growing the Bloom filter if it is over capacity."""
+        import numpy as np
+
+        merged = np.union1d(np.asarray(self.sorted_keys), self.log_keys).astype("<u8")
+        temp_path = self._path(KEYS_FILE + ".tmp")
+        merged.tofile(temp_path)
+        os.replace(temp_path, self._path(KEYS_FILE))
+        open(self._path(LOG_FILE), "wb").close()
+
+        if len(merged) > self.meta["capacity"]:
+            self._rebuild_bloom(merged, capacity=max(len(merged) * 2, self.meta["capacity"] * 2))
+
+        self._load()
+        logging.info(f"Compacted global token index to {len(merged)} keys")
+
+    def _rebuild_bloom(self, hashes, capacity: int) -> None:
+        import numpy as np
+
+        bits, rounds = bloom_parameters(capacity, self.error_rate)
+        self.meta = {"version": INDEX_VERSION, "capacity": capacity, "bloom_bits": bits, "bloom_hashes": rounds}
+        bloom = np.zeros(bits // 8, dtype=np.uint8)
+        positions = self._bloom_positions(hashes.astype(np.uint64)).ravel()
+        np.bitwise_or.at(bloom, positions >> np.uint64(3), (np.uint8(1) << (positions & np.uint64(7)).astype(np.uint8)))
+        temp_path = self._path(BLOOM_FILE + ".tmp")
+        bloom.tofile(temp_path)
+        os.replace(temp_path, self._path(BLOOM_FILE))
+        self._write_meta(self.meta)
+
+
+def open_global_token_index(index_dir: Optional[str] = GLOBAL_TOKEN_INDEX_DIR) -> Optional[GlobalTokenIndex]:
+    """Open the configured global token index, or return None when it is disabled or unusable."""
+    if not index_dir:
+        return None
+    try:
+        return GlobalTokenIndex(index_dir)
+    except (OSError, ValueError) as e:
+        logging.warning(f"Global token index unavailable, falling back to wallet history: {e}")
+        return None
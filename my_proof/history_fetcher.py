@@ -0,0 +1,399 @@
+import atexit
+import io
+import json
+import functools
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import zipfile
+import queue
+from concurrent.futures import Future, wait
+from contextlib import suppress
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional
+
+from my_proof.blob_cache import open_blob_cache
+from my_proof.deadline import Deadline, DeadlineExceeded, DeadlineReader
+from my_proof.instrumentation import StageTimings, operation
+from my_proof.input_manifest import open_archive
+from my_proof.streaming_json import STREAM_CHUNK_SIZE, iter_json_array
+from my_proof.token_record import history_object_hook
+from my_proof.uniqueness_index import compact_token
+
+if TYPE_CHECKING:
+    import requests
+
+# Bounds for fetching a wallet's historical submissions
+HISTORY_FETCH_WORKERS = int(os.environ.get("HISTORY_FETCH_WORKERS", 8))
+HISTORY_FETCH_TIMEOUT = float(os.environ.get("HISTORY_FETCH_TIMEOUT", 30))
+HISTORY_FETCH_RETRIES = int(os.environ.get("HISTORY_FETCH_RETRIES", 3))
+# Stream history through gpg and the JSON parser instead of buffering whole files
+HISTORY_STREAMING = os.environ.get("HISTORY_STREAMING", "1") == "1"
+# gpg is CPU-bound (key derivation dominates small files), so it gets its own cap, separate from downloads
+GPG_DECRYPT_WORKERS = int(os.environ.get("GPG_DECRYPT_WORKERS", os.cpu_count() or 1))
+# Decrypted ZIP histories are the only history written to disk: each is capped, in a private directory under this one
+HISTORY_ZIP_MAX_BYTES = int(os.environ.get("HISTORY_ZIP_MAX_BYTES", 256 * 1024 * 1024))
+HISTORY_SPOOL_DIR = os.environ.get("HISTORY_SPOOL_DIR")
+
+_decrypt_slots = threading.BoundedSemaphore(max(1, GPG_DECRYPT_WORKERS))
+# Returned for files not fetched because the deadline passed
+_SKIPPED = object()
+# Returned by fetch_cached when the file has to be downloaded without the blob cache
+_UNCACHED = object()
+
+
+def create_session(pool_size: int = HISTORY_FETCH_WORKERS, retries: int = HISTORY_FETCH_RETRIES) -> "requests.Session":
+    """Create an HTTP session whose connection pool matches the worker count."""
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retry = Retry(
+        total=retries,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET"]),
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+@functools.lru_cache(maxsize=None)
+def get_gpg():
+    """Return the process-wide gpg context, created on first use."""
+    import gnupg
+
+    return gnupg.GPG()
+
+
+@functools.lru_cache(maxsize=None)
+def get_blob_cache():
+    """Return the process-wide blob cache, or None when BLOB_CACHE_DIR is not set."""
+    return open_blob_cache()
+
+
+def fetch_cached(http, file_url, timeout, deadline: Optional[Deadline] = None):
+    """
+    The blob cache's open copy of file_url, or None when the server answered with an error.
+
+    Returns _UNCACHED when there is no blob cache or its disk failed, so the
+    caller downloads the file directly; a cache is never a reason to lose a file.
+    """
+    import requests
+
+    blob_cache = get_blob_cache()
+    if blob_cache is None:
+        return _UNCACHED
+    try:
+        return blob_cache.fetch(http, file_url, timeout, deadline)
+    except (requests.RequestException, DeadlineExceeded):
+        raise
+    except OSError as e:
+        # Both of the above are OSErrors too; anything else comes from the cache's own disk
+        logging.warning(f"Blob cache failed, downloading without it: {e}")
+        return _UNCACHED
+
+
+# Download and decrypt file
+def download_and_decrypt(file_url, gpg_signature, session=None, timeout=HISTORY_FETCH_TIMEOUT, timings: Optional[StageTimings] = None):
+    import requests
+
+    http = session or requests
+    try:
+        with operation(timings, "history_download"):
+            blob = fetch_cached(http, file_url, timeout)
+            if blob is None:
+                return None
+            if blob is not _UNCACHED:
+                with blob:
+                    content = blob.read()
+            else:
+                response = http.get(file_url, timeout=timeout)
+                if response.status_code != 200:
+                    logging.error(f"Failed to download file: {response.status_code}")
+                    return None
+                content = response.content
+    except requests.RequestException as e:
+        logging.error(f"Failed to download file: {e}")
+        return None
+
+    gpg = get_gpg()
+    with _decrypt_slots, operation(timings, "history_decrypt"):
+        decrypted_data = gpg.decrypt(content, passphrase=gpg_signature)
+    if decrypted_data.ok:
+        return decrypted_data.data
+    else:
+        logging.error("Decryption failed.")
+        return None
+
+
+# Extract files from ZIP data
+def extract_files_from_zip(zip_data):
+    json_data_list = []
+
+    # Check if the data is a zip file by inspecting the header
+    if zip_data[:2] == b'PK':  # Check for the "PK" header of ZIP files
+        with zipfile.ZipFile(io.BytesIO(zip_data), 'r') as zip_ref:
+            for file_name in zip_ref.namelist():
+                with zip_ref.open(file_name) as file:
+                    content = file.read().decode("utf-8")
+
+                    if file_name.endswith('.json'):
+                        json_data = json.loads(content, object_hook=history_object_hook)
+                        json_data_list.append(json_data)
+    else:
+        # If it's not a ZIP, assume it's a JSON file directly
+        content = zip_data.decode("utf-8")
+        json_data = json.loads(content, object_hook=history_object_hook)
+        json_data_list.append(json_data)
+
+    return json_data_list
+
+
+@functools.lru_cache(maxsize=None)
+def private_spool_dir() -> str:
+    """A directory only this process's user can read, for decrypted ZIP histories; created on first use."""
+    spool_dir = tempfile.mkdtemp(prefix="history-", dir=HISTORY_SPOOL_DIR)
+    atexit.register(shutil.rmtree, spool_dir, True)
+    return spool_dir
+
+
+def _feed(source, sink) -> None:
+    # Runs on a daemon thread, so a transfer abandoned at the deadline never holds up interpreter exit
+    try:
+        shutil.copyfileobj(source, sink, STREAM_CHUNK_SIZE)
+    except Exception as e:
+        # gpg exited early, the download failed or the deadline passed: gpg sees its input end either way
+        logging.debug(f"Stopped feeding gpg: {e}")
+    finally:
+        with suppress(OSError):
+            sink.close()
+
+
+def _iter_zip_tokens(stream) -> Iterator[Dict[str, Any]]:
+    """Tokens of a decrypted ZIP history, which zipfile can only read from a seekable file."""
+    with tempfile.TemporaryFile(dir=private_spool_dir()) as spool:
+        size = 0
+        for chunk in iter(lambda: stream.read(STREAM_CHUNK_SIZE), b""):
+            size += len(chunk)
+            if size > HISTORY_ZIP_MAX_BYTES:
+                raise ValueError(f"ZIP history larger than the limit of {HISTORY_ZIP_MAX_BYTES} bytes")
+            spool.write(chunk)
+        spool.seek(0)
+        with open_archive(spool, "history") as zip_ref:
+            for member in zip_ref.infolist():
+                if member.filename.endswith('.json'):
+                    with zip_ref.open(member) as file:
+                        yield from iter_json_array(io.TextIOWrapper(file, encoding="utf-8"))
+
+
+def decrypt_history_tokens(encrypted, gpg_signature, deadline: Optional[Deadline] = None) -> Optional[List[Dict[str, Any]]]:
+    """
+    Pipe an encrypted history through gpg and parse tokens from its output as it arrives.
+
+    Only the fields uniqueness needs are kept from each token, so peak memory
+    is one token plus the compacted history, and nothing decrypted reaches
+    the disk. ZIP histories are the exception: zipfile needs a seekable file,
+    so they are spooled to an unlinked file in a private directory, capped at
+    HISTORY_ZIP_MAX_BYTES each. Returns None when decryption fails; tokens
+    parsed before gpg reported the failure are dropped.
+    """
+    gpg = get_gpg()
+    # The passphrase goes through its own pipe, since stdin carries the data
+    passphrase_fd, passphrase_writer = os.pipe()
+    try:
+        os.write(passphrase_writer, gpg_signature.encode("utf-8") + b"\n")
+    finally:
+        os.close(passphrase_writer)
+    args = gpg.make_args(["--decrypt"], passphrase=True)
+    args[args.index("--passphrase-fd") + 1] = str(passphrase_fd)
+    try:
+        process = subprocess.Popen(args, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                   pass_fds=(passphrase_fd,), env=gpg.env)
+    finally:
+        os.close(passphrase_fd)
+
+    threading.Thread(target=_feed, args=(encrypted, process.stdin), daemon=True).start()
+    # A read blocked on a slow connection only notices the deadline at its timeout; gpg is stopped on time
+    remaining = deadline.remaining() if deadline is not None else None
+    watchdog = threading.Timer(remaining, process.kill) if remaining is not None else None
+    if watchdog is not None:
+        watchdog.daemon = True
+        watchdog.start()
+    tokens = parse_error = None
+    try:
+        if process.stdout.peek(2)[:2] == b'PK':
+            tokens = [compact_token(token) for token in _iter_zip_tokens(process.stdout)]
+        else:
+            text = io.TextIOWrapper(process.stdout, encoding="utf-8")
+            try:
+                tokens = [compact_token(token) for token in iter_json_array(text)]
+            finally:
+                # Closing the wrapper would close gpg's stdout before it is drained below
+                text.detach()
+    except (ValueError, zipfile.BadZipFile) as e:
+        # Truncated or garbled output is what a failed decryption looks like, so gpg's verdict comes first
+        parse_error = e
+    finally:
+        # Let gpg finish writing, so it reports whether the data was intact
+        for _ in iter(lambda: process.stdout.read(STREAM_CHUNK_SIZE), b""):
+            pass
+        process.stdout.close()
+        process.wait()
+        if watchdog is not None:
+            watchdog.cancel()
+
+    if process.returncode != 0:
+        if deadline is not None and deadline.expired():
+            raise DeadlineExceeded("Deadline reached while decrypting")
+        logging.error("Decryption failed.")
+        return None
+    if parse_error is not None:
+        raise parse_error
+    return tokens
+
+
+def stream_history_tokens(file_url, gpg_signature, session=None, timeout=HISTORY_FETCH_TIMEOUT,
+                          timings: Optional[StageTimings] = None, deadline: Optional[Deadline] = None) -> Optional[List[Dict[str, Any]]]:
+    """
+    Download, decrypt and parse one historical file with bounded memory.
+
+    The response (or the blob cache's copy) is piped straight into gpg and its
+    output into the parser; see decrypt_history_tokens. A decrypt worker slot
+    is taken before the download starts, so no connection sits idle waiting
+    for one. The transfer stops when the deadline passes.
+    """
+    import requests
+
+    http = session or requests
+    deadline = deadline or Deadline()
+    try:
+        with operation(timings, "history_download"):
+            cached = fetch_cached(http, file_url, timeout, deadline)
+        if cached is None:
+            return None
+        with _decrypt_slots:
+            if deadline.expired():
+                raise DeadlineExceeded("Deadline reached before decryption")
+            if cached is not _UNCACHED:
+                with cached, operation(timings, "history_decrypt"):
+                    return decrypt_history_tokens(DeadlineReader(cached, deadline), gpg_signature, deadline)
+            with http.get(file_url, stream=True, timeout=timeout) as response:
+                if response.status_code != 200:
+                    logging.error(f"Failed to download file: {response.status_code}")
+                    return None
+                response.raw.decode_content = True
+                # Includes the transfer and parsing, which overlap with decryption
+                with operation(timings, "history_decrypt"):
+                    return decrypt_history_tokens(DeadlineReader(response.raw, deadline), gpg_signature, deadline)
+    except requests.RequestException as e:
+        logging.error(f"Failed to download file: {e}")
+        return None
+
+
+def _submit_daemon(fn, items, workers: int) -> List[Future]:
+    """
+    Run fn over items on daemon threads, returning one future per item.
+
+    ThreadPoolExecutor joins its threads at interpreter exit, so work
+    abandoned at the deadline would keep a finished run alive.
+    """
+    futures = [Future() for _ in items]
+    jobs = queue.SimpleQueue()
+    for job in zip(futures, items):
+        jobs.put(job)
+
+    def work():
+        while True:
+            try:
+                future, item = jobs.get_nowait()
+            except queue.Empty:
+                return
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(item))
+            except BaseException as e:
+                future.set_exception(e)
+
+    for _ in range(workers):
+        threading.Thread(target=work, daemon=True).start()
+    return futures
+
+
+def fetch_history(
+    file_mappings: List[Dict[str, Any]],
+    gpg_signature: str,
+    max_workers: int = HISTORY_FETCH_WORKERS,
+    timeout: float = HISTORY_FETCH_TIMEOUT,
+    session: Optional["requests.Session"] = None,
+    timings: Optional[StageTimings] = None,
+    deadline: Optional[Deadline] = None,
+) -> List[Optional[List[Dict[str, Any]]]]:
+    """
+    Download, decrypt and parse historical files concurrently.
+
+    Returns one entry per item of file_mappings, in the same order: the list of
+    JSON documents from that file, or None if it could not be fetched. When
+    the deadline passes, files still queued are cancelled and files in flight
+    are abandoned; both come back as None and are recorded on the deadline.
+    """
+    if not file_mappings:
+        return []
+
+    owns_session = session is None
+    session = session or create_session(pool_size=max_workers)
+    deadline = deadline or Deadline()
+
+    def fetch_one(file_info):
+        if deadline.expired():
+            return _SKIPPED
+        file_url = file_info.get("fileUrl")
+        if not file_url:
+            logging.warning(f"Skipping invalid fileUrl for fileId {file_info.get('fileId')}")
+            return None
+        request_timeout = deadline.timeout(timeout)
+        try:
+            if HISTORY_STREAMING:
+                tokens = stream_history_tokens(file_url, gpg_signature, session=session, timeout=request_timeout, timings=timings,
+                                               deadline=deadline)
+                return None if tokens is None else [{"tokens": tokens}]
+
+            decrypted_data = download_and_decrypt(file_url, gpg_signature, session=session, timeout=request_timeout, timings=timings)
+            if not decrypted_data:
+                return None
+            with operation(timings, "history_parse"):
+                return extract_files_from_zip(decrypted_data)
+        except (ValueError, zipfile.BadZipFile) as e:
+            logging.error(f"Failed to parse fileId {file_info.get('fileId')}: {e}")
+            return None
+        except DeadlineExceeded:
+            return _SKIPPED
+        except OSError as e:
+            # A full or failing local disk costs this file, not the proof
+            logging.error(f"Failed to fetch fileId {file_info.get('fileId')}: {e}")
+            return None
+
+    futures = _submit_daemon(fetch_one, file_mappings, max(1, min(max_workers, len(file_mappings))))
+    try:
+        done, _ = wait(futures, timeout=deadline.remaining())
+        # Results stay in the order of file_mappings regardless of completion order
+        results = [future.result() if future in done else _SKIPPED for future in futures]
+    finally:
+        # Past the deadline, queued files are cancelled and running ones are abandoned: transfers end at their
+        # next read and gpg is killed, and their daemon threads never delay interpreter exit
+        for future in futures:
+            future.cancel()
+        if owns_session:
+            session.close()
+
+    skipped = sum(result is _SKIPPED for result in results)
+    if skipped:
+        deadline.skip("history_files", skipped)
+        logging.warning(f"Deadline reached with {skipped} of {len(file_mappings)} history files not fetched")
+    return [None if result is _SKIPPED else result for result in results]
@@ -0,0 +1,148 @@
+import io
+import json
+import logging
+import os
+import zipfile
+from functools import cached_property
+from typing import IO, Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from my_proof.token_record import submission_object_hook
+
+# Limits on ZIP input, checked against the archive's directory before anything is decompressed
+INPUT_MAX_ARCHIVE_MEMBERS = int(os.environ.get("INPUT_MAX_ARCHIVE_MEMBERS", 1000))
+INPUT_MAX_UNCOMPRESSED_BYTES = int(os.environ.get("INPUT_MAX_UNCOMPRESSED_BYTES", 512 * 1024 * 1024))
+
+
+def parse_params(lines: Iterable[str]) -> Dict[str, str]:
+    """Parse "key: value" parameter lines."""
+    params = {}
+    for line in lines:
+        key, value = line.strip().split(": ", 1)
+        params[key] = value
+    return params
+
+
+def read_params_file(file_path: str) -> Dict[str, str]:
+    """Read "key: value" parameters from a text file."""
+    with open(file_path, "r") as file:
+        return parse_params(file)
+
+
+def open_archive(source: Union[str, IO[bytes]], name: str = "archive") -> zipfile.ZipFile:
+    """
+    Open a ZIP archive after checking it against the input limits.
+
+    Sizes come from the central directory, and zipfile stops reading a member
+    at its declared size, so an archive that passes cannot expand beyond
+    INPUT_MAX_UNCOMPRESSED_BYTES while it is read.
+    """
+    try:
+        zip_ref = zipfile.ZipFile(source, 'r')
+    except zipfile.BadZipFile as e:
+        raise ValueError(f"Invalid ZIP archive {name}: {e}") from e
+
+    members = [member for member in zip_ref.infolist() if not member.is_dir()]
+    uncompressed_bytes = sum(member.file_size for member in members)
+    if len(members) > INPUT_MAX_ARCHIVE_MEMBERS:
+        zip_ref.close()
+        raise ValueError(f"ZIP archive {name} has {len(members)} members, more than the limit of {INPUT_MAX_ARCHIVE_MEMBERS}")
+    if uncompressed_bytes > INPUT_MAX_UNCOMPRESSED_BYTES:
+        zip_ref.close()
+        raise ValueError(f"ZIP archive {name} expands to {uncompressed_bytes} bytes, more than the limit of {INPUT_MAX_UNCOMPRESSED_BYTES}")
+    return zip_ref
+
+
+class InputManifest:
+    """
+    The proof input, scanned once and parsed once.
+
+    Every stage of the proof reads the submission through this object instead of
+    listing and re-reading the input directory on its own. ZIP archives among
+    the input files are read in place: their top-level .json and .txt members
+    are parsed straight from the archive, and nothing is extracted to disk.
+    """
+
+    def __init__(self, input_dir: str, file_names: List[str], archives: Iterable[Tuple[str, IO[bytes]]] = ()):
+        self.input_dir = input_dir
+        self.json_files: List[Tuple[str, Any]] = []
+        # Text of .txt members read from archives; .txt files on disk are read on demand
+        self._txt_contents: Dict[str, str] = {}
+
+        # Archive members take precedence over same-named files, as extracting them would have
+        json_sources: Dict[str, Any] = {}
+        txt_names = set()
+        for file_name in file_names:
+            file_path = self.path(file_name)
+            if zipfile.is_zipfile(file_path):
+                archives = [*archives, (file_name, file_path)]
+            elif file_name.endswith('.json'):
+                json_sources.setdefault(file_name, None)
+            elif file_name.endswith('.txt'):
+                txt_names.add(file_name)
+
+        for archive_name, source in archives:
+            with open_archive(source, archive_name) as zip_ref:
+                for member in zip_ref.infolist():
+                    # Only top-level members are submission files
+                    if member.is_dir() or '/' in member.filename:
+                        continue
+                    if member.filename.endswith('.json'):
+                        with zip_ref.open(member) as file:
+                            json_sources[member.filename] = self._load_json(file, f"{archive_name}:{member.filename}")
+                    elif member.filename.endswith('.txt'):
+                        self._txt_contents[member.filename] = zip_ref.read(member).decode("utf-8")
+                        txt_names.add(member.filename)
+
+        for file_name in sorted(json_sources):
+            json_data = json_sources[file_name]
+            if json_data is None:
+                with open(self.path(file_name), 'r') as file:
+                    json_data = json.load(file, object_hook=submission_object_hook)
+            self.json_files.append((file_name, json_data))
+        self.txt_files = sorted(txt_names)
+        self.file_names = sorted({*file_names, *json_sources, *txt_names})
+
+    @staticmethod
+    def _load_json(file: IO[bytes], name: str) -> Any:
+        try:
+            return json.load(file, object_hook=submission_object_hook)
+        except (ValueError, zipfile.BadZipFile) as e:
+            raise ValueError(f"Could not read {name}: {e}") from e
+
+    @classmethod
+    def scan(cls, input_dir: str) -> "InputManifest":
+        return cls(input_dir, os.listdir(input_dir))
+
+    @classmethod
+    def from_archive_bytes(cls, data: bytes, name: str = "submission.zip", input_dir: str = "") -> "InputManifest":
+        """Manifest for a ZIP archive held in memory."""
+        return cls(input_dir, [], archives=[(name, io.BytesIO(data))])
+
+    def path(self, file_name: str) -> str:
+        return os.path.join(self.input_dir, file_name)
+
+    @property
+    def json_documents(self) -> List[Any]:
+        return [json_data for _, json_data in self.json_files]
+
+    @cached_property
+    def params(self) -> Dict[str, str]:
+        """Parameters from the first .txt file in the input, if any."""
+        if not self.txt_files:
+            return {}
+        file_name = self.txt_files[0]
+        if file_name in self._txt_contents:
+            return parse_params(self._txt_contents[file_name].splitlines())
+        return read_params_file(self.path(file_name))
+
+    @property
+    def author(self) -> Optional[str]:
+        return self.params.get("author")
+
+
+def as_manifest(source: Union[str, InputManifest]) -> InputManifest:
+    """Accept either a manifest or an input directory path."""
+    if isinstance(source, InputManifest):
+        return source
+    logging.debug(f"Scanning input directory {source}")
+    return InputManifest.scan(source)
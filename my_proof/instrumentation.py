@@ -0,0 +1,152 @@
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Optional
+
+# Include the per-stage timings block in ProofResponse.attributes
+PROOF_TIMINGS = os.environ.get("PROOF_TIMINGS", "1") == "1"
+
+METRICS_JSON_FILE = "metrics.json"
+METRICS_PROM_FILE = "metrics.prom"
+
+# (field, Prometheus metric name, help text)
+PROMETHEUS_METRICS = [
+    ("wall_seconds", "proof_stage_wall_seconds", "Wall-clock time spent in each proof stage."),
+    ("cpu_seconds", "proof_stage_cpu_seconds", "Process CPU time (user + system) spent in each proof stage."),
+    ("bytes_read", "proof_stage_read_bytes", "Bytes read by the process (files and sockets) during each proof stage."),
+    ("peak_rss_bytes", "proof_stage_peak_rss_bytes", "Process peak resident set size at the end of each proof stage."),
+]
+PROMETHEUS_OPERATION_METRICS = [
+    ("count", "proof_operation_count", "Times each per-file operation ran during the proof."),
+    ("total_seconds", "proof_operation_seconds_total", "Time spent in each per-file operation, summed across threads."),
+    ("max_seconds", "proof_operation_max_seconds", "Slowest single run of each per-file operation."),
+]
+
+
+def read_bytes() -> Optional[int]:
+    """Bytes read by this process so far, from /proc/self/io; None where unavailable."""
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                if line.startswith("rchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def peak_rss_bytes() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _snapshot():
+    return time.perf_counter(), time.process_time(), read_bytes()
+
+
+def _measure(started, ended) -> Dict[str, Any]:
+    wall_started, cpu_started, read_started = started
+    wall_ended, cpu_ended, read_ended = ended
+    return {
+        "wall_seconds": wall_ended - wall_started,
+        "cpu_seconds": cpu_ended - cpu_started,
+        "bytes_read": read_ended - read_started if read_started is not None and read_ended is not None else None,
+        "peak_rss_bytes": peak_rss_bytes(),
+    }
+
+
+class StageTimings:
+    """
+    Wall time, CPU time, bytes read and peak RSS for each stage of a proof.
+
+    CPU time, bytes read and RSS are process-wide, so stages of proofs running
+    concurrently in one process (the proof service) include each other's work.
+    Operations repeated inside a stage, such as decrypting each historical
+    file, are observed separately with their count, total and slowest time.
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self.operations: Dict[str, Dict[str, Any]] = {}
+        self._operations_lock = threading.Lock()
+        self._started = _snapshot()
+
+    @contextmanager
+    def stage(self, name: str):
+        started = _snapshot()
+        try:
+            yield
+        finally:
+            measured = _measure(started, _snapshot())
+            previous = self.stages.get(name)
+            if previous is not None:
+                # A stage entered more than once reports its combined cost
+                for field in ("wall_seconds", "cpu_seconds", "bytes_read"):
+                    if previous[field] is not None and measured[field] is not None:
+                        measured[field] += previous[field]
+            self.stages[name] = measured
+
+    def observe(self, name: str, seconds: float) -> None:
+        """Record one run of a per-file operation; safe to call from worker threads."""
+        with self._operations_lock:
+            operation = self.operations.setdefault(name, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+            operation["count"] += 1
+            operation["total_seconds"] += seconds
+            operation["max_seconds"] = max(operation["max_seconds"], seconds)
+
+    @contextmanager
+    def operation(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started)
+
+    def as_dict(self) -> Dict[str, Any]:
+        timings = {"stages": dict(self.stages), "total": _measure(self._started, _snapshot())}
+        if self.operations:
+            with self._operations_lock:
+                timings["operations"] = {name: dict(operation) for name, operation in self.operations.items()}
+        return timings
+
+    def to_prometheus(self, timings: Optional[Dict[str, Any]] = None) -> str:
+        """Render the timings in the Prometheus text exposition format."""
+        timings = timings or self.as_dict()
+        lines = []
+        for field, metric, help_text in PROMETHEUS_METRICS:
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} gauge")
+            for name, measured in [*timings["stages"].items(), ("total", timings["total"])]:
+                if measured[field] is not None:
+                    lines.append(f'{metric}{{stage="{name}"}} {measured[field]}')
+        for field, metric, help_text in PROMETHEUS_OPERATION_METRICS:
+            if not timings.get("operations"):
+                break
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} gauge")
+            for name, operation in timings["operations"].items():
+                lines.append(f'{metric}{{operation="{name}"}} {operation[field]}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, output_dir: str) -> None:
+        """Write metrics.json and metrics.prom into output_dir."""
+        timings = self.as_dict()
+        with open(os.path.join(output_dir, METRICS_JSON_FILE), 'w', encoding='utf-8') as f:
+            json.dump(timings, f, indent=2)
+        with open(os.path.join(output_dir, METRICS_PROM_FILE), 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus(timings))
+
+
+def stage(timings: Optional[StageTimings], name: str):
+    """Time a stage when timings are being collected, otherwise do nothing."""
+    return timings.stage(name) if timings is not None else nullcontext()
+
+
+def operation(timings: Optional[StageTimings], name: str):
+    """Observe one run of a per-file operation when timings are being collected."""
+    return timings.operation(name) if timings is not None else nullcontext()
@@ -0,0 +1,67 @@
+import json
+import logging
+import os
+import sys
+from collections import Counter
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+# "text" for plain messages, "json" for one JSON object per line
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "text")
+# Per-token messages of each kind logged per proof before the rest are only counted
+LOG_TOKEN_MESSAGES = int(os.environ.get("LOG_TOKEN_MESSAGES", 20))
+
+# Attributes every LogRecord has; anything else was passed through extra= and is logged as a field
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with any extra= fields alongside the message."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES})
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging() -> None:
+    """Set up the root logger from LOG_LEVEL and LOG_FORMAT."""
+    handler = logging.StreamHandler(sys.stderr)
+    if LOG_FORMAT == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(message)s"))
+    logging.basicConfig(level=LOG_LEVEL, handlers=[handler])
+
+
+class CappedLog:
+    """
+    Logs the first few messages of each kind and counts the rest.
+
+    Used for messages emitted once per token, so a submission with thousands
+    of rejected tokens costs a bounded number of log lines. Arguments are
+    formatted lazily, only for messages that are actually emitted.
+    """
+
+    def __init__(self, limit: int = LOG_TOKEN_MESSAGES, logger: logging.Logger = logging.getLogger()):
+        self.limit = limit
+        self.logger = logger
+        self.counts = Counter()
+
+    def log(self, kind: str, level: int, message: str, *args) -> None:
+        self.counts[kind] += 1
+        if self.counts[kind] <= self.limit:
+            self.logger.log(level, message, *args, extra={"kind": kind})
+
+    def flush(self) -> None:
+        """Log how many messages of each kind went over the cap."""
+        for kind, count in self.counts.items():
+            if count > self.limit:
+                self.logger.info("%d more '%s' messages not logged (%d in total)", count - self.limit, kind, count,
+                                 extra={"kind": kind, "suppressed": count - self.limit})
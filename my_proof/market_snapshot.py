@@ -0,0 +1,199 @@
+import argparse
+import csv
+import functools
+import logging
+import os
+import struct
+import sys
+import time
+from typing import Iterable, List, Optional, Tuple
+
+from my_proof.global_token_index import hash_token_key
+from my_proof.token_record import TokenKey, TokenRecord
+
+# Reference market data for authenticity cross-checks; unset disables them
+MARKET_SNAPSHOT_FILE = os.environ.get("MARKET_SNAPSHOT_FILE")
+# Relative deviation from the reference beyond which a submitted metric counts as fabricated
+MARKET_SNAPSHOT_TOLERANCE = float(os.environ.get("MARKET_SNAPSHOT_TOLERANCE", 0.25))
+
+MAGIC = b"MKTSNAP\x00"
+SNAPSHOT_VERSION = 1
+# magic, version, table size, rows, longest probe sequence, creation time
+HEADER = struct.Struct("<8sIQQId")
+HEADER_SIZE = 64
+# Columns after the key column, one float64 per table slot
+COLUMNS = ("price", "circulatingSupply", "marketCap")
+
+
+def _key_hash(key: TokenKey) -> int:
+    # 0 marks an empty slot
+    return hash_token_key(key) or 1
+
+
+class MarketSnapshot:
+    """
+    Reference price, supply and market cap per (chain, contract), memory-mapped.
+
+    The file is an open-addressing hash table laid out as columns: 64-bit key
+    hashes, then one float64 column per metric, all indexed by slot. Opening
+    it reads only the header, and each lookup touches a slot or two of each
+    column whatever the number of tokens covered. Lookups are vectorized over
+    a whole submission.
+    """
+
+    def __init__(self, path: str):
+        import numpy as np
+
+        self.path = path
+        with open(path, "rb") as f:
+            magic, version, table_size, rows, max_probe, created = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError(f"{path} is not a version {SNAPSHOT_VERSION} market snapshot")
+        self.table_size = table_size
+        self.rows = rows
+        self.max_probe = max_probe
+        self.created = created
+
+        data = np.memmap(path, dtype=np.uint8, mode="r")
+        column_bytes = table_size * 8
+        if len(data) != HEADER_SIZE + column_bytes * (1 + len(COLUMNS)):
+            raise ValueError(f"{path} is truncated")
+        self.keys = data[HEADER_SIZE:HEADER_SIZE + column_bytes].view("<u8")
+        self.columns = {
+            name: data[HEADER_SIZE + column_bytes * (1 + position):HEADER_SIZE + column_bytes * (2 + position)].view("<f8")
+            for position, name in enumerate(COLUMNS)
+        }
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def slots(self, keys: List[TokenKey]):
+        """Table slot of each key, or -1 for keys the snapshot does not cover."""
+        import numpy as np
+
+        hashes = np.fromiter((_key_hash(key) for key in keys), dtype=np.uint64, count=len(keys))
+        found = np.full(len(keys), -1, dtype=np.int64)
+        mask = np.uint64(self.table_size - 1)
+        pending = np.arange(len(keys))
+        for probe in range(self.max_probe + 1):
+            if not pending.size:
+                break
+            slots = ((hashes[pending] + np.uint64(probe)) & mask).astype(np.int64)
+            stored = self.keys[slots]
+            hit = stored == hashes[pending]
+            found[pending[hit]] = slots[hit]
+            # A key is absent once its probe sequence reaches an empty slot
+            pending = pending[~hit & (stored != 0)]
+        return found
+
+    def mismatches(self, keys: List[TokenKey], metrics_list, tolerance: float = MARKET_SNAPSHOT_TOLERANCE):
+        """
+        Which tokens report metrics that disagree with the reference.
+
+        A metric disagrees when it deviates from a positive reference value by
+        more than tolerance, relatively. Tokens the snapshot does not cover and
+        metrics that are missing or not numbers are not judged.
+        """
+        import numpy as np
+
+        slots = self.slots(keys)
+        covered = slots >= 0
+        mismatched = np.zeros(len(keys), dtype=bool)
+        if not covered.any():
+            return mismatched, covered
+
+        rows = np.flatnonzero(covered)
+        for name in COLUMNS:
+            reference = np.asarray(self.columns[name][slots[rows]])
+            submitted = np.array([_as_float(metrics_list[row].get(name)) for row in rows], dtype=np.float64)
+            with np.errstate(all="ignore"):
+                deviation = np.abs(submitted - reference) / reference
+            mismatched[rows] |= (reference > 0) & np.isfinite(submitted) & (deviation > tolerance)
+        return mismatched, covered
+
+
+def _as_float(value) -> float:
+    # bool is an int subclass but is not a metric value
+    return float(value) if type(value) in (int, float) else float("nan")
+
+
+def write_market_snapshot(path: str, rows: Iterable[Tuple[str, str, float, float, float]]) -> int:
+    """Build a snapshot file from (chain, contract, price, circulatingSupply, marketCap) rows; returns the row count."""
+    import numpy as np
+
+    # Later rows for the same token replace earlier ones
+    entries = {}
+    for chain, contract, *values in rows:
+        entries[_key_hash(TokenRecord(chain, contract).key)] = values
+
+    table_size = 16
+    while table_size < 2 * len(entries):
+        table_size *= 2
+    keys = np.zeros(table_size, dtype="<u8")
+    columns = np.full((len(COLUMNS), table_size), np.nan, dtype="<f8")
+    max_probe = 0
+    for key_hash, values in entries.items():
+        slot, probe = key_hash & (table_size - 1), 0
+        while keys[slot]:
+            slot, probe = (slot + 1) & (table_size - 1), probe + 1
+        keys[slot] = key_hash
+        columns[:, slot] = values
+        max_probe = max(max_probe, probe)
+
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, SNAPSHOT_VERSION, table_size, len(entries), max_probe, time.time()).ljust(HEADER_SIZE, b"\0"))
+        keys.tofile(f)
+        for column in columns:
+            column.tofile(f)
+    os.replace(temp_path, path)
+    return len(entries)
+
+
+def get_market_snapshot(path: Optional[str] = MARKET_SNAPSHOT_FILE) -> Optional[MarketSnapshot]:
+    """
+    Return the process-wide market snapshot, or None when it is disabled or unusable.
+
+    The file is stat'ed on every call and reopened when it has been replaced,
+    so long-lived processes pick up a refreshed snapshot; opening reads only the header.
+    """
+    if not path:
+        return None
+    try:
+        stat = os.stat(path)
+        identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        identity = None
+    return _open_market_snapshot(path, identity)
+
+
+# Proofs still running keep their own reference, so only the current file needs to stay cached
+@functools.lru_cache(maxsize=2)
+def _open_market_snapshot(path: str, identity) -> Optional[MarketSnapshot]:
+    try:
+        snapshot = MarketSnapshot(path)
+    except (OSError, ValueError) as e:
+        logging.warning(f"Market snapshot unavailable, skipping reference checks: {e}")
+        return None
+    logging.info(f"Using market snapshot {path} with {len(snapshot)} tokens")
+    return snapshot
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Build a market snapshot for authenticity cross-checks.")
+    parser.add_argument("csv", help="CSV with chain, contract, price, circulatingSupply and marketCap columns")
+    parser.add_argument("output", help="Snapshot file to write")
+    args = parser.parse_args(argv)
+
+    with open(args.csv, newline="", encoding="utf-8") as f:
+        rows = [
+            (row["chain"], row["contract"], *(float(row[name]) if row.get(name) else float("nan") for name in COLUMNS))
+            for row in csv.DictReader(f)
+        ]
+    count = write_market_snapshot(args.output, rows)
+    print(f"Wrote {count} tokens to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,11 @@
+import os
 from typing import Dict, Optional, Any
 
 from pydantic import BaseModel
 
+# "compact" writes results on one line; "pretty" indents them for reading
+RESULTS_FORMAT = os.environ.get("RESULTS_FORMAT", "compact")
+
 
 class ProofResponse(BaseModel):
     """
@@ -30,3 +34,8 @@ class ProofResponse(BaseModel):
     uniqueness: float = 0.0
     attributes: Optional[Dict[str, Any]] = {}
     metadata: Optional[Dict[str, Any]] = {}
+
+    def to_json(self, results_format: Optional[str] = None) -> str:
+        """Serialize for results.json; compact output keeps the cost proportional to the data alone."""
+        pretty = (results_format or RESULTS_FORMAT) == "pretty"
+        return self.model_dump_json(indent=2 if pretty else None)
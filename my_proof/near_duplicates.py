@@ -0,0 +1,147 @@
+import os
+import string
+import zlib
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+# Detect submissions whose analysis text is copied from another token
+NEAR_DUPLICATE_DETECTION = os.environ.get("NEAR_DUPLICATE_DETECTION", "1") == "1"
+# Estimated Jaccard similarity of word shingles from which a text counts as a near-duplicate
+NEAR_DUPLICATE_THRESHOLD = float(os.environ.get("NEAR_DUPLICATE_THRESHOLD", 0.8))
+# Signature length: values kept per text
+MINHASH_PERMUTATIONS = int(os.environ.get("MINHASH_PERMUTATIONS", 64))
+# LSH bands; rows per band is MINHASH_PERMUTATIONS // LSH_BANDS
+LSH_BANDS = int(os.environ.get("LSH_BANDS", 16))
+
+# Free-text fields of a token that are compared
+TEXT_FIELDS = ("on_chain_analysis", "reason_recommend")
+SHINGLE_WORDS = 3
+# Texts with fewer words than this are too short to call copied
+MIN_TEXT_WORDS = 8
+
+# ASCII punctuation splits words like whitespace does; bytes.translate is several times faster than a regex
+_PUNCTUATION_TO_SPACE = bytes.maketrans(string.punctuation.encode("ascii"), b" " * len(string.punctuation))
+WORD_HASH_CACHE_SIZE = 1 << 20
+_word_hashes: Dict[bytes, int] = {}
+# Multiply-shift hash of each shingle: top 32 bits of (a * x + b) with an odd 64-bit a
+_HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+_HASH_OFFSET = 0x632BE59BD9B4E019
+
+
+def text_signature(token: Dict[str, Any]) -> Optional[bytes]:
+    """
+    MinHash signature of a token's analysis text, or None when it has too little text.
+
+    One-permutation MinHash: every word 3-shingle is hashed once and the
+    hashes are split into MINHASH_PERMUTATIONS bins by value, keeping the
+    minimum of each bin. Empty bins borrow from the next filled bin, tagged
+    with the distance, so short texts still compare consistently.
+    """
+    import numpy as np
+
+    text = " ".join(token.get(field) for field in TEXT_FIELDS if isinstance(token.get(field), str))
+    words = text.lower().encode("utf-8").translate(_PUNCTUATION_TO_SPACE).split()
+    if len(words) < MIN_TEXT_WORDS:
+        return None
+
+    # crc32 is stable across processes, so signatures can be cached and compared between runs. Analysis texts
+    # share most of their vocabulary, so each word is hashed once per process and then looked up.
+    # History and service threads share the cache, so a full cache is replaced rather than cleared and
+    # this call keeps reading its own reference; a missing word is hashed directly
+    global _word_hashes
+    cache = _word_hashes
+    if len(cache) > WORD_HASH_CACHE_SIZE:
+        cache = _word_hashes = {}
+    for word in set(words).difference(cache):
+        cache[word] = zlib.crc32(word)
+    word_hashes = np.fromiter((cache.get(word) or zlib.crc32(word) for word in words), dtype=np.uint64, count=len(words))
+    # Repeated shingles need no deduplication: they cannot change a minimum
+    shingles = (word_hashes[:-2] * np.uint64(0x9E3779B1) ^ (word_hashes[1:-1] << np.uint64(16)) ^ word_hashes[2:]) & np.uint64(0xFFFFFFFF)
+    hashed = (np.uint64(_HASH_MULTIPLIER) * shingles + np.uint64(_HASH_OFFSET)) >> np.uint64(32)
+
+    bins = MINHASH_PERMUTATIONS
+    bin_width = (1 << 32) // bins
+    signature = np.full(bins, bin_width, dtype=np.uint64)
+    np.minimum.at(signature, (hashed % np.uint64(bins)).astype(np.intp), hashed // np.uint64(bins))
+
+    filled = np.flatnonzero(signature < bin_width)
+    if len(filled) < bins:
+        positions = np.arange(bins)
+        donors = filled[np.searchsorted(filled, positions) % len(filled)]
+        distances = (donors - positions) % bins
+        signature = signature[donors] + distances.astype(np.uint64) * np.uint64(bin_width)
+    return signature.astype("<u4").tobytes()
+
+
+def signature_similarity(first: bytes, second: bytes) -> float:
+    """Estimated Jaccard similarity: the share of MinHash values two signatures agree on."""
+    import numpy as np
+
+    if len(first) != len(second):
+        return 0.0
+    return float(np.mean(np.frombuffer(first, dtype="<u4") == np.frombuffer(second, dtype="<u4")))
+
+
+def graded_uniqueness(similarity: float, threshold: float = NEAR_DUPLICATE_THRESHOLD) -> float:
+    """1.0 below the threshold, falling linearly to 0.0 for an identical text."""
+    if similarity < threshold:
+        return 1.0
+    return max(0.0, (1.0 - similarity) / (1.0 - threshold)) if threshold < 1.0 else 0.0
+
+
+class TextSimilarityIndex:
+    """
+    Locality-sensitive hash index over MinHash signatures.
+
+    Each signature is split into bands, and texts sharing any band land in a
+    common bucket, so finding the near-duplicates of a text only compares it
+    with its bucket-mates instead of every indexed text.
+    """
+
+    def __init__(self, bands: int = LSH_BANDS, threshold: float = NEAR_DUPLICATE_THRESHOLD):
+        self.bands = bands
+        self.threshold = threshold
+        self._count = 0
+        # One row per indexed signature, grown by doubling so candidates compare in one vectorized step
+        self._matrix = None
+        self._buckets: Dict[int, List[int]] = defaultdict(list)
+
+    def _band_keys(self, signature: bytes):
+        width = len(signature) // self.bands
+        return [hash((band, signature[band * width:(band + 1) * width])) for band in range(self.bands)]
+
+    def add(self, signature: Optional[bytes]) -> None:
+        if signature is None:
+            return
+        import numpy as np
+
+        row = np.frombuffer(signature, dtype="<u4")
+        if self._matrix is None:
+            self._matrix = np.empty((64, row.size), dtype="<u4")
+        elif row.size != self._matrix.shape[1]:
+            return
+        elif self._count == len(self._matrix):
+            self._matrix = np.concatenate([self._matrix, np.empty_like(self._matrix)])
+        entry = self._count
+        self._matrix[entry] = row
+        self._count += 1
+        for band_key in self._band_keys(signature):
+            self._buckets[band_key].append(entry)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def max_similarity(self, signature: Optional[bytes]) -> float:
+        """Highest similarity to any indexed text that shares a bucket with this one."""
+        import numpy as np
+
+        if signature is None or not self._count or len(signature) // 4 != self._matrix.shape[1]:
+            return 0.0
+        candidates = set()
+        for band_key in self._band_keys(signature):
+            candidates.update(self._buckets.get(band_key, ()))
+        if not candidates:
+            return 0.0
+        rows = self._matrix[np.fromiter(candidates, dtype=np.intp, count=len(candidates))]
+        agreement = (rows == np.frombuffer(signature, dtype="<u4")).mean(axis=1)
+        return float(agreement.max())
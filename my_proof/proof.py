@@ -2,62 +2,74 @@ from datetime import datetime
 import json
 import logging
 import os
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import json
 
+from my_proof.deadline import Deadline
+from my_proof.input_manifest import InputManifest
+from my_proof.instrumentation import PROOF_TIMINGS, StageTimings
 from my_proof.proof_of_ownership import verify_ownership
 from my_proof.proof_of_uniqueness import uniqueness_details
 from my_proof.proof_of_quality_n_authenticity import final_scores
 from my_proof.models.proof_response import ProofResponse
+from my_proof.resources import ProofResources
+from my_proof.token_record import TokenRecord
 
 class Proof:
-    def __init__(self, config: Dict[str, Any]):
+    def __init__(self, config: Dict[str, Any], manifest: Optional[InputManifest] = None, resources: Optional[ProofResources] = None,
+                 timings: Optional[StageTimings] = None, deadline: Optional[Deadline] = None):
         self.config = config
+        # Without one, the PROOF_DEADLINE_SECONDS budget starts when generate() is called
+        self.deadline = deadline
+        self.timings = timings or StageTimings()
+        if manifest is None:
+            with self.timings.stage("parse_input"):
+                manifest = InputManifest.scan(config['input_dir'])
+        self.manifest = manifest
+        self.resources = resources
         self.proof_response = ProofResponse(dlp_id=config['dlp_id'])
         self.max_rewards = os.environ.get("MAX_TOKEN_REWARD",100)
         self.reward_per_token = os.environ.get("REWARD_PER_TOKEN",1)
         self.wallet_address = ""
     
-    def read_author_from_file(self, file_path: str):
-        """
-        Read parameters from a text file.
-
-        :param file_path: Path to the text file
-        :return: Tuple containing author, signature, and random_string
-        """
-        params = {}
-        with open(file_path, "r") as file:
-            for line in file:
-                key, value = line.strip().split(": ", 1)
-                params[key] = value
-        return params["author"]
-
     def generate(self) -> ProofResponse:
         """Generate proofs for all input files."""
         logging.info("Starting proof generation")
+        deadline = self.deadline or Deadline.from_env()
 
         # Read the wallet address from the first .txt file in the input directory
-        txt_files = [f for f in os.listdir(self.config['input_dir']) if f.endswith('.txt')]
-        if txt_files:
-            self.wallet_address = self.read_author_from_file(os.path.join(self.config['input_dir'], txt_files[0])).lower()
+        if self.manifest.author:
+            self.wallet_address = self.manifest.author.lower()
             logging.info(f"Wallet Address {self.wallet_address}")
 
-        uniqueness_details_ = uniqueness_details(self.wallet_address, self.config['input_dir'] )
+        uniqueness_details_ = uniqueness_details(self.wallet_address, self.manifest, self.resources, self.timings, deadline,
+                                                 submission_id=self.config.get('file_id'))
         unique_tokens = uniqueness_details_.get("unique_json_data", [])
-        combined_tokens = uniqueness_details_.get("old_files_json_data",[])
-        # combined_tokens = unique_tokens + unique_tokens # for testing uniquness
+        uniqueness_index = uniqueness_details_.get("uniqueness_index")
 
         logging.info(f" Count of Unique tokens from proof.py: {len(unique_tokens)}")
 
-        authenticity_score, quality_score, uniqueness_score, metadata = final_scores(unique_tokens, combined_tokens)
+        with self.timings.stage("scoring"):
+            authenticity_score, quality_score, uniqueness_score, metadata = final_scores(unique_tokens, uniqueness_index, deadline)
+        # Tokens the deadline left unscored are neither rewarded nor recorded as submitted
+        if deadline.skipped["tokens"]:
+            unique_tokens = unique_tokens[:len(unique_tokens) - deadline.skipped["tokens"]]
+        # Only scored tokens that passed authenticity and are not copies are rewarded; skipped (invalid chain or
+        # category), inauthentic and copied tokens are not, and stay open for a legitimate submission
+        rewarded_keys = [
+            TokenRecord(item["chain"], item["token_submitted"]).key
+            for item in metadata if item["authenticity"] > 0 and item["uniqueness"] > 0
+        ]
 
-        ownership_score = verify_ownership(self.config['input_dir'])
+        with self.timings.stage("ownership"):
+            # The client this proof's uniqueness stage got, so Redis is asked for once per proof
+            ownership_score = verify_ownership(self.manifest, uniqueness_details_.get("redis_client"))
         self.proof_response.ownership = ownership_score
         self.proof_response.quality = quality_score
         self.proof_response.authenticity = authenticity_score
         self.proof_response.uniqueness = uniqueness_score
 
-        self.proof_response.score = self.calculate_final_score(len(unique_tokens))
+        self.proof_response.score = self.calculate_final_score(len(rewarded_keys))
         self.proof_response.valid = True
 
         # Additional metadata about the proof, written onchain
@@ -68,11 +80,30 @@ class Proof:
         self.proof_response.metadata = {
             'dlp_id': self.config['dlp_id'],
             'submission_time': datetime.now().isoformat(),
-            'token_rewarded': len(unique_tokens) * self.reward_per_token,
+            'token_rewarded': len(rewarded_keys) * self.reward_per_token,
             'metadata': metadata,
 
         }
 
+        # Later proofs treat exactly the tokens this proof rewarded as already submitted
+        if uniqueness_index is not None:
+            with self.timings.stage("global_index_append"):
+                uniqueness_index.record_accepted(rewarded_keys)
+
+        # A run cut short by its deadline is still valid, but says how much of the work it covered
+        if deadline.expires_at is not None:
+            history_files = uniqueness_details_.get("history_files", 0)
+            self.proof_response.attributes['partial'] = deadline.partial
+            self.proof_response.attributes['coverage'] = {
+                'history_files': history_files,
+                'history_files_fetched': history_files - deadline.skipped["history_files"],
+                'unique_tokens': len(unique_tokens) + deadline.skipped["tokens"],
+                'unique_tokens_scored': len(unique_tokens),
+            }
+
+        if PROOF_TIMINGS:
+            self.proof_response.attributes['timings'] = self.timings.as_dict()
+
         return self.proof_response
     
     def calculate_final_score(self, unique_token_count) -> float:
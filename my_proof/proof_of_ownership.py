@@ -1,20 +1,18 @@
 import logging
 import os
-import json
-from eth_account import Account
-from eth_account.messages import encode_defunct
 
-def recover_account(author: str) -> bool:
-    try:
-        message_text = os.environ.get("FIXED_MESSAGE", "Please sign to retrieve your encryption key")
-        signature = os.environ.get("SIGNATURE", "0x0657fd96b385e99d1d76f8d9a27d45cbbe78489bb57325ccbaf642535dfeb1d455223d71fdbb77ce9c12a7e97ca772b1397ac56d29e30e0cd7adee4561e6ce051b")
+from my_proof.input_manifest import as_manifest
+from my_proof.signature_recovery import recover_addresses
+
+def recover_account(author: str, redis_client=None) -> bool:
+    signature = os.environ.get("SIGNATURE", "0x0657fd96b385e99d1d76f8d9a27d45cbbe78489bb57325ccbaf642535dfeb1d455223d71fdbb77ce9c12a7e97ca772b1397ac56d29e30e0cd7adee4561e6ce051b")
 
-        # Encode the message properly
-        message_encoded = encode_defunct(text=message_text)
+    try:
+        # Recovered addresses are memoized, so a wallet's repeat submissions skip the ECDSA recovery
+        recovered_address = recover_addresses([signature], redis_client=redis_client)[signature]
+        if recovered_address is None:
+            return False
 
-        # Recover the address
-        recovered_address = Account.recover_message(message_encoded, signature=signature)
-        
         if recovered_address.lower() == author.lower():
             logging.info(f"Ownership verified successfully for address: {recovered_address}")
             return True
@@ -25,25 +23,23 @@ def recover_account(author: str) -> bool:
         logging.error(f"Error during recovery: {e}")
         return False
 
-def verify_ownership(input_dir: str) -> float:
+def verify_ownership(manifest, redis_client=None) -> float:
     """Verify ownership by checking the signature in a .txt file."""
-    # logging.info(f"Verifying ownership in directory: {input_dir}")
-    json_files = [f for f in os.listdir(input_dir) if f.endswith('.json')]
+    manifest = as_manifest(manifest)
+    json_documents = manifest.json_documents
 
-    if len(json_files) != 1:
+    if len(json_documents) != 1:
         logging.warning("There should be exactly one .json file for wallet address extraction.")
         return 0.0
 
-    json_file_path = os.path.join(input_dir, json_files[0])
-    with open(json_file_path, 'r') as json_file:
-        wallet_data = json.load(json_file)
-        wallet_address = wallet_data.get("userAddress")
+    wallet_data = json_documents[0]
+    wallet_address = wallet_data.get("userAddress")
 
     if not wallet_address:
         logging.warning("Wallet address not found in the .json file.")
         return 0.0
 
-    is_valid = recover_account(wallet_address)
+    is_valid = recover_account(wallet_address, redis_client)
     return 1.0 if is_valid else 0.0
 
 
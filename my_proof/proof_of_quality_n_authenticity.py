@@ -1,9 +1,11 @@
-from base64 import b64decode
 import json
 import logging
 import os
-import base58
-import requests
+
+from my_proof.log_utils import CappedLog
+from my_proof.market_snapshot import get_market_snapshot
+from my_proof.token_record import as_record
+from my_proof.uniqueness_index import UniquenessIndex
 
 def get_risk_status_and_quality(risk_score: float):
             if 8 < risk_score <= 10:
@@ -26,7 +28,7 @@ def get_risk_status_and_quality(risk_score: float):
 
         # individual_quality = max(0, 1 - riskScore); 
 
-def validate_token_metrics(metrics):
+def validate_token_metrics(metrics, log=None):
     """Perform authenticity checks on token metrics."""
     errors = []
     # Logical checks
@@ -38,87 +40,206 @@ def validate_token_metrics(metrics):
     if metrics["volatility24h"] > 100:
         errors.append("Volatility is unrealistically high (>100%).")
     
-    print(f"print the error", errors)
+    if errors and log is not None:
+        log.log("failed_metrics", logging.DEBUG, "Token metrics failed authenticity checks: %s", errors)
 
     return 0.0 if errors else 1.0
 
-def calculate_individual_proofs(unique_tokens, combined_tokens):
-    results = []
-    valid_chains = {
-        "ethereum", "optimistic-ethereum", "cronos", "binance-smart-chain", "xdai", 
-        "polygon-pos", "manta-pacific", "x-layer", "opbnb", "fantom", 
-        "kucoin-community-chain", "zksync", "merlin-chain", "mantle", "base", 
-        "arbitrum-one", "avalanche", "linea", "blast", "bitlayer", 
-        "scroll", "zklink-nova", "tron", "vana", "solana"
-    }
-    
-    valid_attributes = {
-        "momentum-surge", "high-liquidity", "utility-driven", "backed-by-major-investors",
-        "community-powered", "verified-contracts", "disruptive-tech", "major-integrations",
-        "limited-supply"
-    }
-    
-    valid_categories = {
-        "MemeCoins", "Web3Gaming", "BlueChipDeFi", "AIAgent", "Layer1", "Layer2Layer3", 
-        "RWA", "DecentralizedAI", "DecentralizedFinance", "DePIN", "LiquidStakingRestaking", 
-        "BlockchainServiceInfra"
-    }
-    
-    for token in unique_tokens:
-        token_metadata = token.get("token_metadata", {})
-        data_chain = token_metadata.get("chain", "").lower()
-        data_contract = token_metadata.get("contract", "")
-        metrics = token_metadata.get("metrics", {})
+VALID_CHAINS = frozenset({
+    "ethereum", "optimistic-ethereum", "cronos", "binance-smart-chain", "xdai", 
+    "polygon-pos", "manta-pacific", "x-layer", "opbnb", "fantom", 
+    "kucoin-community-chain", "zksync", "merlin-chain", "mantle", "base", 
+    "arbitrum-one", "avalanche", "linea", "blast", "bitlayer", 
+    "scroll", "zklink-nova", "tron", "vana", "solana"
+})
+
+VALID_ATTRIBUTES = frozenset({
+    "momentum-surge", "high-liquidity", "utility-driven", "backed-by-major-investors",
+    "community-powered", "verified-contracts", "disruptive-tech", "major-integrations",
+    "limited-supply"
+})
+
+VALID_CATEGORIES = frozenset({
+    "MemeCoins", "Web3Gaming", "BlueChipDeFi", "AIAgent", "Layer1", "Layer2Layer3", 
+    "RWA", "DecentralizedAI", "DecentralizedFinance", "DePIN", "LiquidStakingRestaking", 
+    "BlockchainServiceInfra"
+})
+
+
+def _is_plain_number(value) -> bool:
+    # bool is an int subclass but excluded so it takes the per-token path
+    return type(value) is float or type(value) is int
+
+
+def score_metrics_batch(metrics_list, validate_list, log=None):
+    """
+    Score authenticity and quality for many tokens at once.
+
+    Metrics are loaded into float64 columns and the market-cap, volatility and
+    risk-bucket rules of validate_token_metrics / get_risk_status_and_quality
+    are applied as array operations. Rows whose values would not survive the
+    float64 conversion unchanged (missing or non-numeric metrics, or an integer
+    price times integer supply) are scored per token, so the results are
+    identical to scoring each token on its own.
+    """
+    import numpy as np
+
+    prices, supplies, market_caps, volatilities, risk_scores = [], [], [], [], []
+    scalar_rows = []
+
+    for row, (metrics, validate) in enumerate(zip(metrics_list, validate_list)):
+        risk_score = metrics.get("riskScore", 0)
+        price = metrics.get("price")
+        supply = metrics.get("circulatingSupply")
+        market_cap = metrics.get("marketCap")
+        volatility = metrics.get("volatility24h")
+
+        columnar = _is_plain_number(risk_score) and (not validate or (
+            _is_plain_number(price) and _is_plain_number(supply) and
+            _is_plain_number(market_cap) and _is_plain_number(volatility) and
+            not (type(price) is int and type(supply) is int)
+        ))
+        if not columnar:
+            scalar_rows.append(row)
+            risk_score = price = supply = market_cap = volatility = 0
+        elif not validate:
+            price = supply = market_cap = volatility = 0
+
+        prices.append(price)
+        supplies.append(supply)
+        market_caps.append(market_cap)
+        volatilities.append(volatility)
+        risk_scores.append(risk_score)
+
+    price = np.array(prices, dtype=np.float64)
+    supply = np.array(supplies, dtype=np.float64)
+    market_cap = np.array(market_caps, dtype=np.float64)
+    volatility = np.array(volatilities, dtype=np.float64)
+    risk_score = np.array(risk_scores, dtype=np.float64)
+    validate = np.array(validate_list, dtype=bool)
+
+    with np.errstate(all="ignore"):
+        expected_market_cap = price * supply
+        market_cap_mismatch = (supply > 0) & (np.abs(expected_market_cap - market_cap) > 0.05 * expected_market_cap)
+    too_volatile = volatility > 100
+    authenticity = np.where(validate & ~(market_cap_mismatch | too_volatile), 1.0, 0.0)
+
+    risk_quality = np.select(
+        [(risk_score > 8) & (risk_score <= 10), (risk_score > 5) & (risk_score <= 8), (risk_score > 3) & (risk_score <= 5)],
+        [0.75, 0.85, 0.95],
+        default=1.0,
+    )
+
+    authenticity_list = authenticity.tolist()
+    quality_list = (risk_quality * authenticity).tolist()
+
+    # Tokens without valid attributes are not validated and score an integer 0
+    for row in np.flatnonzero(~validate).tolist():
+        authenticity_list[row] = 0
+
+    for row in scalar_rows:
+        metrics = metrics_list[row]
+        individual_authenticity = validate_token_metrics(metrics, log) if validate_list[row] else 0
+        authenticity_list[row] = individual_authenticity
+        quality_list[row] = get_risk_status_and_quality(metrics.get("riskScore", 0)) * individual_authenticity
+
+    return authenticity_list, quality_list
+
+
+def cross_check_market_snapshot(keys, metrics_list, validate_list, authenticity_list, quality_list, log=None):
+    """
+    Fail authenticity for tokens whose metrics disagree with the reference market snapshot.
+
+    Consistent but fabricated metrics pass validate_token_metrics; this catches
+    them for every token the snapshot covers. Updates the lists in place and
+    does nothing when no snapshot is configured.
+    """
+    snapshot = get_market_snapshot()
+    if snapshot is None or not keys:
+        return
+    mismatched, covered = snapshot.mismatches(keys, metrics_list)
+    for row in mismatched.nonzero()[0].tolist():
+        if validate_list[row]:
+            authenticity_list[row] = 0.0
+            quality_list[row] = 0.0
+            if log is not None:
+                log.log("reference_mismatch", logging.DEBUG, "Token %s metrics disagree with the market snapshot", keys[row])
+    logging.info("Market snapshot covered %d of %d tokens, %d disagreed", int(covered.sum()), len(keys), int(mismatched.sum()))
+
+
+def calculate_individual_proofs(unique_tokens, uniqueness_index, deadline=None):
+    """Score each submitted token, using the shared index for uniqueness; stops early at the deadline."""
+    if not isinstance(uniqueness_index, UniquenessIndex):
+        # Accept raw history entries for callers that have not built an index
+        uniqueness_index = UniquenessIndex.from_json_data(uniqueness_index or [])
+
+    scored_tokens = []
+    keys = []
+    metrics_list = []
+    validate_list = []
+    log = CappedLog()
+
+    # Shorter than unique_tokens when the deadline cut scoring short
+    uniqueness_scores = uniqueness_index.uniqueness_scores(unique_tokens, deadline)
+    for token, uniqueness in zip(unique_tokens, uniqueness_scores):
+        record = as_record(token)
+        data_chain = record.chain.lower()
+        data_contract = record.contract
         
-        if data_chain not in valid_chains:
-            print(f"Skipping token {data_contract}: Invalid chain {data_chain}")
+        if data_chain not in VALID_CHAINS:
+            log.log("invalid_chain", logging.INFO, "Skipping token %s: Invalid chain %s", data_contract, data_chain)
             continue
         
-        token_category = token.get("tokenCategory", "")
-        if token_category not in valid_categories:
-            print(f"Skipping token {data_contract}: Invalid category {token_category}")
+        token_category = record.category
+        if token_category not in VALID_CATEGORIES:
+            log.log("invalid_category", logging.INFO, "Skipping token %s: Invalid category %s", data_contract, token_category)
             continue
         
-        suggestion_attributes = set(token.get("suggestionAttributes", []))
-        recommendation_attributes = set(token.get("recommendationAttributes", []))
-        has_valid_attributes = bool(suggestion_attributes & valid_attributes or recommendation_attributes & valid_attributes)
-        
-        individual_authenticity = validate_token_metrics(metrics) if has_valid_attributes else 0
-        
-        risk_score = metrics.get("riskScore", 0)
-        individual_quality = get_risk_status_and_quality(risk_score)
-        individual_quality *= individual_authenticity  # Ensure quality is zero if authenticity is zero
-
-        # Calculate uniqueness: Check if the token exists in the combined set
-        is_unique = not any(
-            data_chain == existing_token["token_metadata"]["chain"] and
-            data_contract == existing_token["token_metadata"]["contract"]
-            for existing_token in combined_tokens
+        has_valid_attributes = not (
+            VALID_ATTRIBUTES.isdisjoint(record.suggestion_attributes) and
+            VALID_ATTRIBUTES.isdisjoint(record.recommendation_attributes)
         )
-        individual_uniqueness = 1.0 if is_unique else 0.0
-        
-        results.append({
+        metrics_list.append(record.metrics if record.metrics is not None else {})
+        validate_list.append(has_valid_attributes)
+        keys.append(record.key)
+
+        scored_tokens.append((data_contract, data_chain, uniqueness))
+
+    if not scored_tokens:
+        log.flush()
+        return []
+
+    # Authenticity and quality are computed for the whole submission at once
+    authenticity_list, quality_list = score_metrics_batch(metrics_list, validate_list, log)
+    cross_check_market_snapshot(keys, metrics_list, validate_list, authenticity_list, quality_list, log)
+    log.flush()
+
+    return [
+        {
             "token_submitted": data_contract,
             "chain": data_chain,
             "authenticity": individual_authenticity,
             "quality": individual_quality,
-            "uniqueness": individual_uniqueness
-        })
-    
-    return results
+            "uniqueness": uniqueness
+        }
+        for (data_contract, data_chain, uniqueness), individual_authenticity, individual_quality
+        in zip(scored_tokens, authenticity_list, quality_list)
+    ]
 
-def final_scores(unique_tokens, combined_tokens):
+def final_scores(unique_tokens, uniqueness_index, deadline=None):
     """Calculate the average authenticity and quality scores."""
-    results = calculate_individual_proofs(unique_tokens, combined_tokens)
+    results = calculate_individual_proofs(unique_tokens, uniqueness_index, deadline)
     # unique_token_count = len(unique_tokens)
     
     if not results:
-        return 0, 0
+        return 0, 0, 0, results
 
     quality_avg = sum(result["quality"] for result in results) / len(results)
     authenticity_avg = sum(result["authenticity"] for result in results) / len(results)
     uniqueness_avg = sum(result["uniqueness"] for result in results) / len(results)
-    logging.info(f"authenticity_avg: {authenticity_avg}, quality_avg: {quality_avg}, uniqueness_avg:, {uniqueness_avg},results, {results[0]}")
+    logging.info("authenticity_avg: %s, quality_avg: %s, uniqueness_avg: %s over %d tokens",
+                 authenticity_avg, quality_avg, uniqueness_avg, len(results))
+    logging.debug("First token result: %s", results[0])
     return authenticity_avg, quality_avg, uniqueness_avg, results
 
 # Example of how this would be executed
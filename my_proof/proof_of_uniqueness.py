@@ -1,34 +1,14 @@
 import os
-import bs4
-import jinja2
-import redis
-import requests
-import gnupg
-import zipfile
-import io
-import pandas as pd
-import json
 import logging
-import yaml
-from deepdiff import DeepDiff  # Ensure deepdiff is installed
-
-# Initialize Redis connection
-def get_redis_client():
-    try:
-        redis_client = redis.StrictRedis(
-            host=os.environ.get('REDIS_HOST', 'localhost'),
-            port=int(os.environ.get('REDIS_PORT', 6379)),
-            db=0,
-            password=os.environ.get('REDIS_PWD', None),
-            decode_responses=True,
-            socket_timeout=30,
-            retry_on_timeout=True
-        )
-        redis_client.ping()
-        return redis_client
-    except redis.ConnectionError:
-        logging.warning("Redis connection failed. Proceeding without caching.")
-        return None
+
+from my_proof.global_token_index import open_global_token_index
+from my_proof.history_fetcher import fetch_history
+from my_proof.input_manifest import as_manifest
+from my_proof.instrumentation import stage
+from my_proof.log_utils import LOG_TOKEN_MESSAGES
+from my_proof.redis_pool import get_redis_client, redis_breaker
+from my_proof.uniqueness_index import UniquenessIndex, flatten_tokens, submission_digest, token_key
+from my_proof.wallet_snapshot import open_wallet_snapshot
 
 # Fetch file mappings from API
 # TODO: Remove comments
@@ -50,113 +30,81 @@ def get_file_mappings(wallet_address):
     #         ,{"fileId":1615146, "fileUrl":"https://drive.google.com/uc?export=download&id=1qm0gQ3w462qZYdTrDH4bU8wuH8Qs9dVq"}
     #         ]
 
-# Download and decrypt file
-def download_and_decrypt(file_url, gpg_signature):
-    response = requests.get(file_url)
-    if response.status_code == 200:
-        gpg = gnupg.GPG()
-        decrypted_data = gpg.decrypt(response.content, passphrase=gpg_signature)
-        if decrypted_data.ok:
-            return decrypted_data.data
+def process_json_files(redis_client, file_mappings, gpg_signature, manifest, session=None, history_cache=None, global_index=None, timings=None,
+                       deadline=None, snapshot=None, submission_id=None):
+    # Files already folded into the wallet's snapshot are not read again
+    if snapshot is not None:
+        file_mappings = snapshot.pending(file_mappings)
+
+    # One slot per file so the history keeps the order of file_mappings
+    history_slots = [None] * len(file_mappings)
+    pending_positions = []
+    file_ids = [file_info.get("fileId") for file_info in file_mappings]
+
+    with stage(timings, "history_cache_read"):
+        # Files already parsed by this process (batch workers, the proof service) come first
+        cached_json_data = history_cache.get_many(file_ids) if history_cache is not None else {}
+
+        # A single pipelined read serves every file the cache already holds
+        submission_cache = None
+        if redis_client and redis_breaker.allow():
+            # Only loaded when Redis is configured and has not failed recently
+            from my_proof.submission_cache import SubmissionCache
+            submission_cache = SubmissionCache(redis_client)
+            cached_json_data.update(submission_cache.get_many(file_id for file_id in file_ids if file_id not in cached_json_data))
+
+    for position, file_id in enumerate(file_ids):
+        if file_id in cached_json_data:
+            history_slots[position] = cached_json_data[file_id]
         else:
-            logging.error("Decryption failed.")
-            return None
-    else:
-        logging.error(f"Failed to download file: {response.status_code}")
-        return None
-
-# Extract files from ZIP data
-def extract_files_from_zip(zip_data):
-    json_data_list = []
-
-    # Check if the data is a zip file by inspecting the header
-    if zip_data[:2] == b'PK':  # Check for the "PK" header of ZIP files
-        with zipfile.ZipFile(io.BytesIO(zip_data), 'r') as zip_ref:
-            for file_name in zip_ref.namelist():
-                with zip_ref.open(file_name) as file:
-                    content = file.read().decode("utf-8")
-                    
-                    if file_name.endswith('.json'):
-                        json_data = json.loads(content)
-                        json_data_list.append(json_data)
-    else:
-        # If it's not a ZIP, assume it's a JSON file directly
-        content = zip_data.decode("utf-8")
-        json_data = json.loads(content)
-        json_data_list.append(json_data)
-    
-    return json_data_list
-
-def process_json_files(redis_client, file_mappings, gpg_signature, input_dir):
-    combined_json_data = []
-
-    if redis_client:
-        for file_info in file_mappings:
-            file_id = file_info.get("fileId")
-            if redis_client.exists(file_id):
-                stored_json_data = redis_client.hget(file_id, "submission_data")
-                if stored_json_data:
-                    json_data = json.loads(stored_json_data)
-                    combined_json_data.extend(json_data)
-                else:
-                    file_url = file_info.get("fileUrl")
-                    if not file_url:
-                        logging.warning(f"Skipping invalid fileUrl for fileId {file_id}")
-                        continue
-
-                    decrypted_data = download_and_decrypt(file_url, gpg_signature)
-                    if decrypted_data:
-                        json_data_list = extract_files_from_zip(decrypted_data)
-                        if json_data_list:
-                            combined_json_data.extend(json_data_list)
-            else:
-                file_url = file_info.get("fileUrl")
-                if not file_url:
-                    logging.warning(f"Skipping invalid fileUrl for fileId {file_id}")
-                    continue
-                decrypted_data = download_and_decrypt(file_url, gpg_signature)
-                if decrypted_data:
-                    json_data_list = extract_files_from_zip(decrypted_data)
-                    if json_data_list:
-                        combined_json_data.extend(json_data_list)
+            pending_positions.append(position)
+
+    # Download and decrypt everything not served from the cache concurrently
+    pending_files = [file_mappings[position] for position in pending_positions]
+    fetched_json_data = {}
+    with stage(timings, "history_fetch"):
+        fetched = fetch_history(pending_files, gpg_signature, session=session, timings=timings, deadline=deadline)
+        for position, json_data_list in zip(pending_positions, fetched):
+            history_slots[position] = json_data_list
+            if json_data_list is not None:
+                fetched_json_data[file_mappings[position].get("fileId")] = json_data_list
+
+    # Write misses back so later proofs skip the download and decryption
+    with stage(timings, "history_cache_write"):
+        if submission_cache:
+            submission_cache.put_many(fetched_json_data)
+        if history_cache is not None:
+            history_cache.put_many({**cached_json_data, **fetched_json_data})
+
+    if snapshot is not None:
+        with stage(timings, "history_snapshot_write"):
+            # Files that failed or were cut off by the deadline stay pending for the next proof
+            for file_id, json_data_list in zip(file_ids, history_slots):
+                if json_data_list is not None:
+                    snapshot.add(file_id, json_data_list)
+            try:
+                snapshot.save()
+            except OSError as e:
+                logging.warning(f"History snapshot write failed: {e}")
+        # The snapshot now holds the newly fetched files too, so the history is indexed from it alone
+        combined_json_data = [{"tokens": snapshot.tokens}]
     else:
-        for file_info in file_mappings:
-            file_url = file_info.get("fileUrl")
-            if not file_url:
-                logging.warning(f"Skipping invalid fileUrl for fileId {file_info.get('fileId')}")
-                continue
-            decrypted_data = download_and_decrypt(file_url, gpg_signature)
-            if decrypted_data:
-                json_data_list = extract_files_from_zip(decrypted_data)
-                if json_data_list:
-                    combined_json_data.extend(json_data_list)
-
-    curr_file_json_data = []
-    local_json_files = [f for f in os.listdir(input_dir) if f.endswith('.json')]
-    for json_file in local_json_files:
-        file_path = os.path.join(input_dir, json_file)
-        with open(file_path, 'r') as file:
-            json_data = json.load(file)
-            curr_file_json_data.append(json_data)
-        with open(file_path, 'w') as file:
-            json.dump(json_data, file, indent=4)
-
-    print("JSON files processed and formatted successfully.")
-
-    # Flatten the list of tokens for comparison
-    curr_file_tokens = [token for entry in curr_file_json_data for token in entry["tokens"]]
-    combined_tokens = [token for entry in combined_json_data for token in entry.get("tokens", [])]
-
-    # Calculate uniqueness by comparing current file tokens against combined (old) tokens
-    unique_tokens = []
-    for token in curr_file_tokens:
-        # Check if the token exists in the combined data with the exact same 'reason'
-        if not any(
-            token["token_metadata"]["chain"] == existing_token["token_metadata"]["chain"] and
-            token["token_metadata"]["contract"] == existing_token["token_metadata"]["contract"]
-            for existing_token in combined_tokens
-        ):
-            unique_tokens.append(token)
+        combined_json_data = [json_data for json_data_list in history_slots if json_data_list for json_data in json_data_list]
+
+    # The submission itself was parsed once when the input manifest was built
+    manifest = as_manifest(manifest)
+    curr_file_json_data = manifest.json_documents
+
+    with stage(timings, "uniqueness"):
+        curr_file_tokens = flatten_tokens(curr_file_json_data)
+        if global_index is not None and submission_id is None:
+            submission_id = submission_digest(manifest.author, curr_file_tokens)
+        # Index the history once so every membership check is O(1)
+        uniqueness_index = UniquenessIndex(flatten_tokens(combined_json_data), global_index=global_index, submission_id=submission_id)
+
+        # A token is unique if it is not in the history and not repeated within this submission
+        unique_mask = uniqueness_index.unique_mask(curr_file_tokens)
+        unique_tokens = [token for token, is_unique in zip(curr_file_tokens, unique_mask) if is_unique]
 
     # Calculate total and unique entries
     total_json_entries = len(curr_file_tokens)
@@ -165,25 +113,50 @@ def process_json_files(redis_client, file_mappings, gpg_signature, input_dir):
     # Uniqueness score calculation
     json_uniqueness_score = unique_json_entries / total_json_entries if total_json_entries > 0 else 0.0
 
-    print(f"Uniqueness Score: {json_uniqueness_score}, {unique_json_entries} unique tokens out of {total_json_entries} total tokens.")
-    print(f"Unique Tokens: {unique_tokens}")
+    logging.info("Uniqueness Score: %s, %d unique tokens out of %d total tokens.",
+                 json_uniqueness_score, unique_json_entries, total_json_entries)
+    # Keys only, and only the first few; the full tokens would put every analysis text in the log
+    logging.debug("Unique Tokens: %s", [token_key(token) for token in unique_tokens[:LOG_TOKEN_MESSAGES]])
 
-    return combined_json_data, curr_file_json_data, json_uniqueness_score, unique_tokens
+    return combined_json_data, curr_file_json_data, json_uniqueness_score, unique_tokens, uniqueness_index
 
 
-def uniqueness_details(wallet_address, input_dir):
+def uniqueness_details(wallet_address, manifest, resources=None, timings=None, deadline=None, submission_id=None):
+    snapshot_wallet = wallet_address
     wallet_address = wallet_address or "0x1234567890abcdef"
     gpg_signature = os.environ.get("SIGNATURE") or "0x0657fd96b385e99d1d76f8d9a27d45cbbe78489bb57325ccbaf642535dfeb1d455223d71fdbb77ce9c12a7e97ca772b1397ac56d29e30e0cd7adee4561e6ce051b"
-    redis_client = get_redis_client()
-    file_mappings = get_file_mappings(wallet_address)
-    
-    combined_json_data, curr_file_json_data, json_uniqueness_score, unique_json_entries = process_json_files(redis_client, file_mappings, gpg_signature, input_dir)
+
+    # The global index already holds every accepted token, so wallet history is only needed without it
+    with stage(timings, "global_index_open"):
+        global_index = open_global_token_index()
+    snapshot = None
+    if global_index is not None:
+        logging.info(f"Using global token index with {len(global_index)} tokens")
+        file_mappings = []
+    else:
+        file_mappings = get_file_mappings(wallet_address)
+        with stage(timings, "history_snapshot_read"):
+            snapshot = open_wallet_snapshot(snapshot_wallet)
+
+    # Long-lived processes pass in their warm connections and parsed history. The Redis client is looked up
+    # for every proof, through the circuit breaker, so a process started while Redis was down picks it up later
+    with stage(timings, "redis_connect"):
+        redis_client = resources.get_redis_client() if resources is not None else get_redis_client()
+    session = resources.session if resources is not None else None
+    history_cache = resources.history_cache if resources is not None else None
+
+    combined_json_data, curr_file_json_data, json_uniqueness_score, unique_json_entries, uniqueness_index = process_json_files(
+        redis_client, file_mappings, gpg_signature, manifest, session=session, history_cache=history_cache,
+        global_index=global_index, timings=timings, deadline=deadline, snapshot=snapshot, submission_id=submission_id)
     
     return {
         "unique_json_data": unique_json_entries,
         "old_files_json_data": combined_json_data,
         "curr_file_json_data": curr_file_json_data,
-        "uniqueness_score": json_uniqueness_score
+        "uniqueness_score": json_uniqueness_score,
+        "uniqueness_index": uniqueness_index,
+        "history_files": len(file_mappings),
+        "redis_client": redis_client,
     }
 
 # Execute the script independently
@@ -193,7 +166,7 @@ if __name__ == "__main__":
     gpg_signature = "0x0657fd96b385e99d1d76f8d9a27d45cbbe78489bb57325ccbaf642535dfeb1d455223d71fdbb77ce9c12a7e97ca772b1397ac56d29e30e0cd7adee4561e6ce051b"
     input_dir = "../demo/input"
     
-    combined_json_data, curr_file_json_data, json_uniqueness_score, unique_json_entries = process_json_files(redis_client, file_mappings, gpg_signature, input_dir)
+    combined_json_data, curr_file_json_data, json_uniqueness_score, unique_json_entries, _ = process_json_files(redis_client, file_mappings, gpg_signature, input_dir)
     
     print("Unique JSON Entries:", unique_json_entries)
     print("Combined JSON Data:", combined_json_data)
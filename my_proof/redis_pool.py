@@ -0,0 +1,98 @@
+import functools
+import logging
+import os
+import threading
+import time
+
+# Redis is only a cache, so an unreachable server must cost milliseconds, not the proof's time budget
+REDIS_CONNECT_TIMEOUT = float(os.environ.get("REDIS_CONNECT_TIMEOUT", 0.5))
+REDIS_SOCKET_TIMEOUT = float(os.environ.get("REDIS_SOCKET_TIMEOUT", 2))
+REDIS_MAX_CONNECTIONS = int(os.environ.get("REDIS_MAX_CONNECTIONS", 32))
+# Consecutive failures that open the breaker, and how long it then stays open
+REDIS_BREAKER_FAILURES = int(os.environ.get("REDIS_BREAKER_FAILURES", 1))
+REDIS_BREAKER_COOLDOWN = float(os.environ.get("REDIS_BREAKER_COOLDOWN", 30))
+
+
+class CircuitBreaker:
+    """
+    Remembers recent Redis failures so later proofs skip Redis instead of waiting on it.
+
+    After max_failures consecutive failures the breaker opens and allow()
+    returns False for cooldown seconds. Then a single caller is let through
+    to try again, and its result closes or reopens the breaker. Thread-safe.
+    """
+
+    def __init__(self, max_failures: int = REDIS_BREAKER_FAILURES, cooldown: float = REDIS_BREAKER_COOLDOWN):
+        self.max_failures = max(1, max_failures)
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.cooldown:
+                return False
+            # Half-open: restart the cooldown so only this caller probes Redis
+            self.opened_at = time.monotonic()
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.max_failures:
+                if self.opened_at is None:
+                    logging.warning(f"Skipping Redis for {self.cooldown:g}s after {self.failures} consecutive failures")
+                self.opened_at = time.monotonic()
+
+
+redis_breaker = CircuitBreaker()
+
+
+@functools.lru_cache(maxsize=None)
+def get_connection_pool(host: str, port: int, password=None):
+    """The process-wide connection pool for one Redis server, created on first use."""
+    import redis
+
+    # Blocking, so a burst of proofs waits briefly for a free connection instead of failing
+    return redis.BlockingConnectionPool(
+        host=host,
+        port=port,
+        db=0,
+        password=password,
+        decode_responses=True,
+        socket_connect_timeout=REDIS_CONNECT_TIMEOUT,
+        socket_timeout=REDIS_SOCKET_TIMEOUT,
+        max_connections=REDIS_MAX_CONNECTIONS,
+        timeout=REDIS_SOCKET_TIMEOUT,
+    )
+
+
+def get_redis_client():
+    """A client on the shared pool, or None when Redis is unreachable or failed recently."""
+    import redis
+
+    if not redis_breaker.allow():
+        logging.info("Redis failed recently. Proceeding without caching.")
+        return None
+
+    redis_client = redis.Redis(connection_pool=get_connection_pool(
+        os.environ.get('REDIS_HOST', 'localhost'),
+        int(os.environ.get('REDIS_PORT', 6379)),
+        os.environ.get('REDIS_PWD', None),
+    ))
+    try:
+        redis_client.ping()
+    except redis.RedisError:
+        redis_breaker.record_failure()
+        logging.warning("Redis connection failed. Proceeding without caching.")
+        return None
+    redis_breaker.record_success()
+    return redis_client
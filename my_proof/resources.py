@@ -0,0 +1,74 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+HISTORY_CACHE_FILES = int(os.environ.get("HISTORY_CACHE_FILES", 1024))
+
+
+class HistoryCache:
+    """In-process LRU of parsed historical files, keyed by fileId. Thread-safe."""
+
+    def __init__(self, max_files: int = HISTORY_CACHE_FILES):
+        self.max_files = max_files
+        self._entries: "OrderedDict[Any, List[Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, file_ids) -> Dict[Any, List[Dict[str, Any]]]:
+        found = {}
+        with self._lock:
+            for file_id in file_ids:
+                if file_id in self._entries:
+                    self._entries.move_to_end(file_id)
+                    found[file_id] = self._entries[file_id]
+        return found
+
+    def put_many(self, entries: Dict[Any, List[Dict[str, Any]]]) -> None:
+        with self._lock:
+            for file_id, json_data_list in entries.items():
+                if file_id is None:
+                    continue
+                self._entries[file_id] = json_data_list
+                self._entries.move_to_end(file_id)
+            while len(self._entries) > self.max_files:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class ProofResources:
+    """
+    Connections and caches that outlive a single proof.
+
+    A one-shot run creates these implicitly; long-lived processes (batch
+    workers, the proof service) create them once and pass them to every Proof.
+    Everything here may be used from several threads at once. Redis clients
+    are not kept: each proof asks for one, so it goes through the circuit
+    breaker and picks Redis back up once it recovers.
+    """
+
+    def __init__(self, session=None, history_cache: Optional[HistoryCache] = None,
+                 redis_client_factory: Optional[Callable[[], Any]] = None):
+        self.session = session
+        self.history_cache = history_cache if history_cache is not None else HistoryCache()
+        self.redis_client_factory = redis_client_factory
+
+    def get_redis_client(self):
+        """A Redis client for one proof, or None when Redis is unavailable."""
+        if self.redis_client_factory is not None:
+            return self.redis_client_factory()
+        from my_proof.redis_pool import get_redis_client
+        return get_redis_client()
+
+    @classmethod
+    def create(cls) -> "ProofResources":
+        from my_proof.history_fetcher import create_session, get_gpg
+
+        # Start gpg now so the first proof does not pay for it
+        get_gpg()
+        return cls(session=create_session())
+
+    def close(self) -> None:
+        if self.session is not None:
+            self.session.close()
@@ -0,0 +1,199 @@
+import importlib
+import json
+import logging
+import os
+import signal
+import socketserver
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+from my_proof.input_manifest import InputManifest
+from my_proof.instrumentation import StageTimings
+from my_proof.models.proof_response import ProofResponse
+from my_proof.proof import Proof
+from my_proof.resources import ProofResources
+
+PROOF_SERVICE_CONCURRENCY = int(os.environ.get("PROOF_SERVICE_CONCURRENCY", 4))
+PROOF_SERVICE_DRAIN_TIMEOUT = float(os.environ.get("PROOF_SERVICE_DRAIN_TIMEOUT", 30))
+PROOF_SERVICE_MAX_BODY_BYTES = int(os.environ.get("PROOF_SERVICE_MAX_BODY_BYTES", 50 * 1024 * 1024))
+
+
+class ProofService:
+    """
+    Generates proofs for submissions received by the HTTP front end.
+
+    Holds the warm resources shared by every request, limits how many proofs
+    run at once and tracks in-flight work so shutdown can drain it.
+    """
+
+    def __init__(self, config: Dict[str, Any], resources: ProofResources, max_concurrency: int = PROOF_SERVICE_CONCURRENCY):
+        self.config = config
+        self.resources = resources
+        self.max_concurrency = max_concurrency
+        self.draining = False
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._in_flight = 0
+        self._idle = threading.Condition()
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def try_acquire(self) -> bool:
+        """Reserve a proof slot without waiting; False when draining or at capacity."""
+        if self.draining or not self._slots.acquire(blocking=False):
+            return False
+        with self._idle:
+            self._in_flight += 1
+        return True
+
+    def release(self) -> None:
+        with self._idle:
+            self._in_flight -= 1
+            self._idle.notify_all()
+        self._slots.release()
+
+    def drain(self, timeout: float = PROOF_SERVICE_DRAIN_TIMEOUT) -> bool:
+        """Stop taking new proofs and wait for in-flight ones; True if all finished."""
+        self.draining = True
+        with self._idle:
+            return self._idle.wait_for(lambda: self._in_flight == 0, timeout=timeout)
+
+    def prove(self, body: bytes, content_type: str, author: Optional[str] = None) -> ProofResponse:
+        """Generate the proof for a submission sent as a JSON document or a ZIP archive."""
+        timings = StageTimings()
+        if content_type == "application/zip":
+            with timings.stage("parse_input"):
+                manifest = InputManifest.from_archive_bytes(body)
+            return Proof({**self.config, 'input_dir': manifest.input_dir, 'file_id': None}, manifest, self.resources, timings).generate()
+
+        with tempfile.TemporaryDirectory() as work_dir:
+            with timings.stage("parse_input"):
+                with open(os.path.join(work_dir, "submission.json"), 'wb') as f:
+                    f.write(body)
+                if author:
+                    with open(os.path.join(work_dir, "author.txt"), 'w') as f:
+                        f.write(f"author: {author}\n")
+                manifest = InputManifest.scan(work_dir)
+            return Proof({**self.config, 'input_dir': manifest.input_dir, 'file_id': None}, manifest, self.resources, timings).generate()
+
+
+class ProofRequestHandler(BaseHTTPRequestHandler):
+    """POST /proof with a submission body returns its ProofResponse; GET /health reports load."""
+
+    server_version = "ProofService/1.0"
+
+    def address_string(self) -> str:
+        # Unix socket peers have no (host, port) address
+        return self.client_address[0] if self.client_address else "unix"
+
+    def _send_json(self, status: int, payload: Any, headers: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        service = self.server.service
+        if self.path != "/health":
+            self._send_json(404, {"error": "Not found"})
+            return
+        self._send_json(503 if service.draining else 200, {
+            "status": "draining" if service.draining else "ok",
+            "in_flight": service.in_flight,
+            "max_concurrency": service.max_concurrency,
+        })
+
+    def do_POST(self) -> None:
+        service = self.server.service
+        if self.path != "/proof":
+            self._send_json(404, {"error": "Not found"})
+            return
+
+        length = int(self.headers.get("Content-Length") or 0)
+        if length <= 0:
+            self._send_json(400, {"error": "Request body is empty"})
+            return
+        if length > PROOF_SERVICE_MAX_BODY_BYTES:
+            self._send_json(413, {"error": f"Request body exceeds {PROOF_SERVICE_MAX_BODY_BYTES} bytes"})
+            return
+
+        if not service.try_acquire():
+            self._send_json(503, {"error": "Service is busy or draining"}, headers={"Retry-After": "1"})
+            return
+        try:
+            body = self.rfile.read(length)
+            content_type = (self.headers.get("Content-Type") or "application/json").split(";")[0].strip()
+            status, payload = 200, service.prove(body, content_type, self.headers.get("X-Author")).model_dump()
+        except ValueError as e:
+            status, payload = 400, {"error": f"Invalid submission: {e}"}
+        except Exception as e:
+            logging.exception("Error during proof generation")
+            status, payload = 500, {"error": str(e)}
+        finally:
+            # Free the slot before responding so the client can immediately send another proof
+            service.release()
+        self._send_json(status, payload)
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self) -> None:
+        socketserver.UnixStreamServer.server_bind(self)
+        self.server_name, self.server_port = "localhost", 0
+
+
+def serve(
+    config: Dict[str, Any],
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    socket_path: Optional[str] = None,
+    max_concurrency: int = PROOF_SERVICE_CONCURRENCY,
+    drain_timeout: float = PROOF_SERVICE_DRAIN_TIMEOUT,
+) -> None:
+    """
+    Run the proof service until SIGTERM or SIGINT, then drain in-flight proofs.
+
+    Listens on socket_path when given, otherwise on host:port.
+    """
+    # Load the deferred dependencies now so no request pays for them
+    for module_name in ("eth_account", "numpy"):
+        importlib.import_module(module_name)
+
+    service = ProofService(config, ProofResources.create(), max_concurrency)
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = ThreadingUnixHTTPServer(socket_path, ProofRequestHandler)
+        logging.info(f"Proof service listening on unix:{socket_path}")
+    else:
+        server = ThreadingHTTPServer((host, port), ProofRequestHandler)
+        logging.info(f"Proof service listening on http://{host}:{server.server_port}")
+    server.service = service
+
+    def request_shutdown(signum, frame):
+        logging.info(f"Received signal {signum}, draining proof service")
+        service.draining = True
+        # shutdown() blocks until serve_forever returns, so it cannot run on this thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, request_shutdown)
+    signal.signal(signal.SIGINT, request_shutdown)
+
+    try:
+        server.serve_forever()
+    finally:
+        if not service.drain(drain_timeout):
+            logging.warning(f"{service.in_flight} proofs still running after {drain_timeout}s drain timeout")
+        server.server_close()
+        service.resources.close()
+        if socket_path and os.path.exists(socket_path):
+            os.unlink(socket_path)
+        logging.info("Proof service stopped")
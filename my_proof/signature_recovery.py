@@ -0,0 +1,200 @@
+import hashlib
+import hmac
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+RECOVERY_CACHE_SIZE = int(os.environ.get("RECOVERY_CACHE_SIZE", 4096))
+# Directory shared by every proof on this node, e.g. under /sealed
+RECOVERY_CACHE_DIR = os.environ.get("RECOVERY_CACHE_DIR")
+# Redis entries are only trusted when signed with this secret; without it Redis is not used
+RECOVERY_CACHE_SECRET = os.environ.get("RECOVERY_CACHE_SECRET")
+RECOVERY_CACHE_TTL = int(os.environ.get("RECOVERY_CACHE_TTL", 30 * 24 * 3600))
+RECOVERY_CACHE_NAMESPACE = os.environ.get("RECOVERY_CACHE_NAMESPACE", "tokendao")
+# Below this many uncached signatures, recovering inline is cheaper than starting workers
+RECOVERY_PARALLEL_THRESHOLD = int(os.environ.get("RECOVERY_PARALLEL_THRESHOLD", 64))
+
+DEFAULT_MESSAGE = "Please sign to retrieve your encryption key"
+
+
+def recovery_key(message_text: str, signature: str) -> str:
+    """Cache key for one (message, signature) pair; the same signature with or without 0x maps to one key."""
+    message_hash = hashlib.sha256(message_text.encode("utf-8")).hexdigest()
+    return f"{message_hash}:{signature.lower().removeprefix('0x')}"
+
+
+def _recover(message_text: str, signature: str) -> Optional[str]:
+    # eth_account is slow to import, so it is only loaded once a signature is not cached
+    from eth_account import Account
+    from eth_account.messages import encode_defunct
+
+    try:
+        return Account.recover_message(encode_defunct(text=message_text), signature=signature)
+    except Exception as e:
+        logging.error(f"Error during recovery: {e}")
+        return None
+
+
+def _recover_pair(pair: Tuple[str, str]) -> Optional[str]:
+    return _recover(*pair)
+
+
+class RecoveryCache:
+    """
+    Addresses already recovered from (message, signature) pairs.
+
+    ECDSA public-key recovery is deterministic, so the result of each pair is
+    kept in a bounded in-process LRU. It is also kept in a directory shared by
+    every proof on the node when one is configured (it must be as trusted as
+    the sealed directory), and in Redis when a client and a signing secret are
+    given. A Redis entry carries an HMAC of its key and address, so a forged
+    entry is ignored and cannot vouch for ownership.
+    """
+
+    def __init__(self, max_entries: int = RECOVERY_CACHE_SIZE, cache_dir: Optional[str] = RECOVERY_CACHE_DIR,
+                 secret: Optional[str] = RECOVERY_CACHE_SECRET):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.secret = secret.encode("utf-8") if secret else None
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        if cache_dir:
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+            except OSError as e:
+                logging.warning(f"Recovery cache directory unavailable, keeping recoveries in memory: {e}")
+                self.cache_dir = None
+
+    def _redis_key(self, key: str) -> str:
+        return f"{RECOVERY_CACHE_NAMESPACE}:recovered:{key}"
+
+    def _sign(self, key: str, address: str) -> str:
+        return hmac.new(self.secret, f"{key}={address}".encode("utf-8"), hashlib.sha256).hexdigest()
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha256(key.encode("utf-8")).hexdigest())
+
+    def _remember(self, key: str, address: str) -> None:
+        with self._lock:
+            self._entries[key] = address
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Forget the in-process entries; the directory and Redis copies are kept."""
+        with self._lock:
+            self._entries.clear()
+
+    def get_many(self, keys: List[str], redis_client=None) -> Dict[str, str]:
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    found[key] = self._entries[key]
+
+        if self.cache_dir:
+            for key in keys:
+                if key in found:
+                    continue
+                try:
+                    with open(self._disk_path(key), encoding="utf-8") as f:
+                        found[key] = f.read().strip()
+                except OSError:
+                    continue
+                self._remember(key, found[key])
+
+        missing = [key for key in keys if key not in found]
+        if missing and redis_client is not None and self.secret:
+            from my_proof.redis_pool import redis_breaker
+            import redis
+
+            if redis_breaker.allow():
+                try:
+                    replies = redis_client.mget([self._redis_key(key) for key in missing])
+                except redis.RedisError as e:
+                    redis_breaker.record_failure()
+                    logging.warning(f"Recovery cache read failed: {e}")
+                    replies = []
+                for key, reply in zip(missing, replies):
+                    address, _, mac = (reply or "").partition(":")
+                    if address and hmac.compare_digest(mac, self._sign(key, address)):
+                        found[key] = address
+                        self._remember(key, address)
+        return found
+
+    def put_many(self, recovered: Dict[str, str], redis_client=None) -> None:
+        for key, address in recovered.items():
+            self._remember(key, address)
+
+        if self.cache_dir:
+            for key, address in recovered.items():
+                try:
+                    fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+                    with os.fdopen(fd, "w", encoding="utf-8") as f:
+                        f.write(address)
+                    os.replace(temp_path, self._disk_path(key))
+                except OSError as e:
+                    logging.warning(f"Recovery cache write failed: {e}")
+                    break
+
+        if recovered and redis_client is not None and self.secret:
+            from my_proof.redis_pool import redis_breaker
+            import redis
+
+            if redis_breaker.allow():
+                pipe = redis_client.pipeline(transaction=False)
+                for key, address in recovered.items():
+                    pipe.set(self._redis_key(key), f"{address}:{self._sign(key, address)}", ex=RECOVERY_CACHE_TTL)
+                try:
+                    pipe.execute()
+                except redis.RedisError as e:
+                    redis_breaker.record_failure()
+                    logging.warning(f"Recovery cache write failed: {e}")
+
+
+recovery_cache = RecoveryCache()
+
+
+def recover_addresses(signatures: Iterable[str], message_text: Optional[str] = None, redis_client=None,
+                      workers: Optional[int] = None) -> Dict[str, Optional[str]]:
+    """
+    Recover the signing address of many signatures over one message.
+
+    Cached pairs cost a dictionary lookup. The rest are recovered once each,
+    across worker processes when there are enough of them to pay for the
+    workers. Returns signature -> address, or None where recovery failed.
+    """
+    if message_text is None:
+        message_text = os.environ.get("FIXED_MESSAGE", DEFAULT_MESSAGE)
+    signatures = list(dict.fromkeys(signatures))
+    keys = {signature: recovery_key(message_text, signature) for signature in signatures}
+    found = recovery_cache.get_many(list(dict.fromkeys(keys.values())), redis_client)
+
+    # Signatures that differ only in case or 0x share a key and are recovered once
+    pending = list({key: signature for signature, key in keys.items() if key not in found}.items())
+    if len(pending) >= RECOVERY_PARALLEL_THRESHOLD and (workers or os.cpu_count() or 1) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            addresses = list(executor.map(_recover_pair, [(message_text, signature) for _, signature in pending],
+                                          chunksize=max(1, len(pending) // (4 * (workers or os.cpu_count())))))
+    else:
+        addresses = [_recover(message_text, signature) for _, signature in pending]
+
+    recovered = {key: address for (key, _), address in zip(pending, addresses) if address is not None}
+    recovery_cache.put_many(recovered, redis_client)
+    found.update(recovered)
+    return {signature: found.get(key) for signature, key in keys.items()}
+
+
+def verify_signatures(pairs: Iterable[Tuple[str, str]], message_text: Optional[str] = None, redis_client=None,
+                      workers: Optional[int] = None) -> List[bool]:
+    """Check many (author, signature) pairs at once; one result per pair, in order."""
+    pairs = list(pairs)
+    addresses = recover_addresses((signature for _, signature in pairs), message_text, redis_client, workers)
+    return [addresses[signature] is not None and addresses[signature].lower() == author.lower()
+            for author, signature in pairs]
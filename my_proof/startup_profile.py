@@ -0,0 +1,83 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+# The module every proof run imports before doing any work
+STARTUP_MODULE = "my_proof.proof"
+STARTUP_IMPORT_BUDGET_MS = float(os.environ.get("STARTUP_IMPORT_BUDGET_MS", 500))
+
+# Heavy dependencies that are only imported by the code paths that need them
+DEFERRED_MODULES = ("numpy", "eth_account", "gnupg", "requests", "redis")
+
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _run_python(*args: str) -> subprocess.CompletedProcess:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [PACKAGE_ROOT, env.get("PYTHONPATH")]))
+    return subprocess.run([sys.executable, *args], capture_output=True, text=True, env=env, check=True)
+
+
+def measure_imports(module: str) -> List[Dict[str, Any]]:
+    """Import module in a fresh interpreter and return its -X importtime entries."""
+    result = _run_python("-X", "importtime", "-c", f"import {module}")
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        entries.append({
+            "module": name.strip(),
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+        })
+    return entries
+
+
+def cumulative_import_ms(entries: List[Dict[str, Any]], module: str) -> float:
+    return next((entry["cumulative_ms"] for entry in reversed(entries) if entry["module"] == module), 0.0)
+
+
+def startup_profile(top: int = 15, budget_ms: float = STARTUP_IMPORT_BUDGET_MS) -> Dict[str, Any]:
+    """Measure the cold-start cost of a proof run and compare it with the budget."""
+    started = time.perf_counter()
+    _run_python("-c", f"import {STARTUP_MODULE}")
+    cold_start_ms = (time.perf_counter() - started) * 1000
+
+    entries = measure_imports(STARTUP_MODULE)
+    import_ms = cumulative_import_ms(entries, STARTUP_MODULE)
+    slowest = sorted(entries, key=lambda entry: entry["self_ms"], reverse=True)[:top]
+    loaded = {entry["module"] for entry in entries}
+
+    deferred = {}
+    for module in DEFERRED_MODULES:
+        try:
+            deferred[module] = {
+                "import_ms": cumulative_import_ms(measure_imports(module), module),
+                "loaded_at_startup": module in loaded,
+            }
+        except subprocess.CalledProcessError:
+            deferred[module] = {"import_ms": None, "loaded_at_startup": False}
+
+    return {
+        "startup_module": STARTUP_MODULE,
+        "cold_start_ms": round(cold_start_ms, 1),
+        "import_ms": import_ms,
+        "budget_ms": budget_ms,
+        "within_budget": import_ms <= budget_ms,
+        "slowest_imports": [
+            {"module": entry["module"], "self_ms": entry["self_ms"], "cumulative_ms": entry["cumulative_ms"]}
+            for entry in slowest
+        ],
+        "deferred_imports": deferred,
+    }
+
+
+def main() -> int:
+    """Print the startup report; a non-zero exit code means the budget was exceeded."""
+    report = startup_profile()
+    print(json.dumps(report, indent=2))
+    return 0 if report["within_budget"] else 1
@@ -0,0 +1,102 @@
+import json
+from typing import Any, Iterator, TextIO
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = " \t\n\r"
+# Characters that can continue a number the decoder has already accepted, as in "2" of "2.5e-3"
+_NUMBER_CHARS = frozenset("0123456789.eE+-")
+_decoder = json.JSONDecoder()
+
+
+class _StreamReader:
+    """Sliding text buffer over a stream that only keeps the value being decoded."""
+
+    def __init__(self, stream: TextIO, chunk_size: int):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, min_size: int = 0) -> bool:
+        # Drop what has already been consumed before reading more
+        if self.pos:
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        chunk = self.stream.read(max(self.chunk_size, min_size))
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer += chunk
+        return True
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character without consuming it, '' at EOF."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                return ""
+
+    def take(self, expected: str) -> str:
+        char = self.peek()
+        if char not in expected:
+            raise ValueError(f"Expected one of {expected!r} in JSON stream, got {char!r}")
+        self.pos += 1
+        return char
+
+    def _may_continue(self, end: int) -> bool:
+        while end < len(self.buffer):
+            if self.buffer[end] not in _NUMBER_CHARS:
+                return False
+            end += 1
+        return True
+
+    def decode_value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+                # A number running up to the end of the buffer may continue in the next chunk
+                if self.eof or not self._may_continue(end):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # Double the pending window so large values are decoded in O(size)
+            self.fill(len(self.buffer) - self.pos)
+
+
+def iter_json_array(stream: TextIO, key: str = "tokens", chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[Any]:
+    """
+    Yield the items of the top-level array under key, one at a time.
+
+    Only the item being decoded is held in memory; every other top-level
+    value is decoded and discarded.
+    """
+    reader = _StreamReader(stream, chunk_size)
+    reader.take("{")
+    if reader.peek() == "}":
+        return
+
+    while True:
+        name = reader.decode_value()
+        reader.take(":")
+        if name == key and reader.peek() == "[":
+            reader.take("[")
+            if reader.peek() == "]":
+                reader.take("]")
+            else:
+                while True:
+                    yield reader.decode_value()
+                    if reader.take(",]") == "]":
+                        break
+        else:
+            reader.decode_value()
+
+        if reader.take(",}") == "}":
+            return
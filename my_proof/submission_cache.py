@@ -0,0 +1,139 @@
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Iterable, List
+
+import redis
+
+from my_proof.redis_pool import redis_breaker
+from my_proof.token_record import history_object_hook, record_to_json
+
+# Bump when the cached value format changes so old entries are ignored
+SUBMISSION_CACHE_VERSION = 3
+SUBMISSION_CACHE_NAMESPACE = os.environ.get("SUBMISSION_CACHE_NAMESPACE", "tokendao")
+SUBMISSION_CACHE_TTL = int(os.environ.get("SUBMISSION_CACHE_TTL", 7 * 24 * 3600))
+SUBMISSION_CACHE_MAX_ENTRIES = int(os.environ.get("SUBMISSION_CACHE_MAX_ENTRIES", 100000))
+SUBMISSION_CACHE_MAX_ENTRY_BYTES = int(os.environ.get("SUBMISSION_CACHE_MAX_ENTRY_BYTES", 5 * 1024 * 1024))
+
+
+class SubmissionCache:
+    """
+    Redis cache of parsed submission data, keyed by fileId.
+
+    Entries live under a versioned key with a TTL, and a sorted set tracks last
+    access so the cache is trimmed to max_entries least-recently-used first.
+    Reads for a whole run go out in one pipeline, as do the write-backs.
+    Failures feed the shared Redis circuit breaker, so once Redis stops
+    answering later proofs skip the cache instead of waiting on it.
+    """
+
+    def __init__(
+        self,
+        redis_client,
+        ttl: int = SUBMISSION_CACHE_TTL,
+        max_entries: int = SUBMISSION_CACHE_MAX_ENTRIES,
+        max_entry_bytes: int = SUBMISSION_CACHE_MAX_ENTRY_BYTES,
+        namespace: str = SUBMISSION_CACHE_NAMESPACE,
+    ):
+        self.redis_client = redis_client
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_entry_bytes = max_entry_bytes
+        self.prefix = f"{namespace}:v{SUBMISSION_CACHE_VERSION}"
+        self.lru_key = f"{self.prefix}:submission-lru"
+        self._hit_keys = []
+        self._legacy_hits = {}
+
+    def key(self, file_id) -> str:
+        return f"{self.prefix}:submission:{file_id}"
+
+    def get_many(self, file_ids: Iterable[Any]) -> Dict[Any, List[Dict[str, Any]]]:
+        """Return cached submission data for every file_id found, in one round trip."""
+        file_ids = [file_id for file_id in file_ids if file_id is not None]
+        if not file_ids:
+            return {}
+
+        pipe = self.redis_client.pipeline(transaction=False)
+        for file_id in file_ids:
+            pipe.get(self.key(file_id))
+            # Entries written by the validator before the versioned schema
+            pipe.hget(file_id, "submission_data")
+        try:
+            replies = pipe.execute(raise_on_error=False)
+        except redis.RedisError as e:
+            redis_breaker.record_failure()
+            logging.warning(f"Submission cache read failed: {e}")
+            return {}
+        redis_breaker.record_success()
+
+        cached = {}
+        for position, file_id in enumerate(file_ids):
+            for is_legacy, stored_json_data in enumerate(replies[2 * position:2 * position + 2]):
+                if not stored_json_data or isinstance(stored_json_data, Exception):
+                    continue
+                try:
+                    cached[file_id] = json.loads(stored_json_data, object_hook=history_object_hook)
+                except ValueError:
+                    logging.warning(f"Ignoring corrupt cache entry for fileId {file_id}")
+                    continue
+                if is_legacy:
+                    # Migrate to the versioned key on the next write-back
+                    self._legacy_hits[file_id] = cached[file_id]
+                else:
+                    self._hit_keys.append(self.key(file_id))
+                break
+
+        logging.info(f"Submission cache: {len(cached)} hits, {len(file_ids) - len(cached)} misses")
+        return cached
+
+    def put_many(self, entries: Dict[Any, List[Dict[str, Any]]]) -> None:
+        """Write back freshly decrypted submissions and refresh the hits of this run."""
+        now = time.time()
+        pipe = self.redis_client.pipeline(transaction=False)
+        touched = {}
+        entries = {**self._legacy_hits, **entries}
+        self._legacy_hits = {}
+
+        for file_id, json_data_list in entries.items():
+            if file_id is None:
+                continue
+            payload = json.dumps(json_data_list, separators=(",", ":"), default=record_to_json)
+            if len(payload) > self.max_entry_bytes:
+                logging.info(f"Not caching fileId {file_id}: {len(payload)} bytes exceeds the entry limit")
+                continue
+            pipe.set(self.key(file_id), payload, ex=self.ttl)
+            touched[self.key(file_id)] = now
+
+        for key in self._hit_keys:
+            pipe.expire(key, self.ttl)
+            touched[key] = now
+        self._hit_keys = []
+
+        if not touched or not redis_breaker.allow():
+            return
+
+        pipe.zadd(self.lru_key, touched)
+        # Drop index entries whose keys have expired, then measure what is left
+        pipe.zremrangebyscore(self.lru_key, "-inf", now - self.ttl)
+        pipe.zcard(self.lru_key)
+        try:
+            size = pipe.execute()[-1]
+            if size > self.max_entries:
+                self._evict(size - self.max_entries)
+        except redis.RedisError as e:
+            redis_breaker.record_failure()
+            logging.warning(f"Submission cache write failed: {e}")
+        else:
+            redis_breaker.record_success()
+
+    def _evict(self, count: int) -> None:
+        """Delete the count least-recently-used entries."""
+        stale_keys = self.redis_client.zrange(self.lru_key, 0, count - 1)
+        if not stale_keys:
+            return
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.delete(*stale_keys)
+        pipe.zrem(self.lru_key, *stale_keys)
+        pipe.execute()
+        logging.info(f"Evicted {len(stale_keys)} submissions from the cache")
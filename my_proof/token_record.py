@@ -0,0 +1,122 @@
+import base64
+import sys
+from typing import Any, Dict, Optional, Tuple, Union
+
+from my_proof.near_duplicates import NEAR_DUPLICATE_DETECTION, text_signature
+
+TokenKey = Tuple[str, str]
+
+# Field holding the base64 MinHash signature when a record is written back to JSON
+SIGNATURE_FIELD = "text_signature"
+
+# The only metrics scoring reads; name, symbol, volume and the like are dropped
+SCORED_METRICS = ("price", "circulatingSupply", "marketCap", "volatility24h", "riskScore")
+
+
+def _intern(value: Any) -> Any:
+    # Chains and categories come from small vocabularies, so every record shares one copy of each
+    return sys.intern(value) if type(value) is str else value
+
+
+class TokenRecord:
+    """
+    The parts of a submitted token that uniqueness and scoring use.
+
+    Built while the JSON is parsed, so the multi-kilobyte analysis and
+    suggestion texts are never kept; only their MinHash signature is, for
+    near-duplicate detection. History tokens carry just their key and signature.
+    """
+
+    __slots__ = ("chain", "contract", "metrics", "category", "suggestion_attributes", "recommendation_attributes",
+                 "signature")
+
+    def __init__(self, chain: str, contract: str, metrics: Optional[Dict[str, Any]] = None, category: Optional[str] = None,
+                 suggestion_attributes: Tuple[str, ...] = (), recommendation_attributes: Tuple[str, ...] = (),
+                 signature: Optional[bytes] = None):
+        self.chain = _intern(chain)
+        self.contract = contract
+        self.metrics = metrics
+        self.category = _intern(category)
+        self.suggestion_attributes = suggestion_attributes
+        self.recommendation_attributes = recommendation_attributes
+        self.signature = signature
+
+    @classmethod
+    def from_dict(cls, token: Dict[str, Any]) -> "TokenRecord":
+        token_metadata = token.get("token_metadata") or {}
+        metrics = token_metadata.get("metrics", {})
+        if isinstance(metrics, dict):
+            metrics = {name: metrics[name] for name in SCORED_METRICS if name in metrics}
+        return cls(
+            token_metadata.get("chain") or "",
+            token_metadata.get("contract") or "",
+            metrics,
+            token.get("tokenCategory", ""),
+            tuple(_intern(attribute) for attribute in token.get("suggestionAttributes") or ()),
+            tuple(_intern(attribute) for attribute in token.get("recommendationAttributes") or ()),
+            signature=_signature(token),
+        )
+
+    @classmethod
+    def key_only(cls, token: Dict[str, Any]) -> "TokenRecord":
+        """A history token: only the fields needed to rebuild its key and compare its text."""
+        token_metadata = token.get("token_metadata") or {}
+        return cls(token_metadata.get("chain") or "", token_metadata.get("contract") or "", signature=_signature(token))
+
+    @property
+    def key(self) -> TokenKey:
+        """The normalized (chain, contract) key used for uniqueness checks."""
+        chain = self.chain.strip().lower()
+        contract = self.contract.strip()
+        # EVM addresses are case-insensitive hex, base58 addresses (e.g. solana) are not
+        if contract[:2].lower() == "0x":
+            contract = contract.lower()
+        return chain, contract
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The token in submission JSON form, with only the retained fields."""
+        token = {"token_metadata": {"chain": self.chain, "contract": self.contract}}
+        if self.metrics is not None:
+            token["token_metadata"]["metrics"] = self.metrics
+            token.update({
+                "tokenCategory": self.category,
+                "suggestionAttributes": list(self.suggestion_attributes),
+                "recommendationAttributes": list(self.recommendation_attributes),
+            })
+        if self.signature is not None:
+            token[SIGNATURE_FIELD] = base64.b64encode(self.signature).decode("ascii")
+        return token
+
+    def __repr__(self) -> str:
+        return f"TokenRecord(chain={self.chain!r}, contract={self.contract!r})"
+
+
+def _signature(token: Dict[str, Any]) -> Optional[bytes]:
+    if not NEAR_DUPLICATE_DETECTION:
+        return None
+    # Records cached as JSON carry their signature instead of the text
+    if SIGNATURE_FIELD in token:
+        return base64.b64decode(token[SIGNATURE_FIELD])
+    return text_signature(token)
+
+
+def as_record(token: Union[TokenRecord, Dict[str, Any]]) -> TokenRecord:
+    """Accept a record or a token dict from callers that parsed JSON themselves."""
+    return token if isinstance(token, TokenRecord) else TokenRecord.from_dict(token)
+
+
+def submission_object_hook(obj: Dict[str, Any]) -> Any:
+    """json object_hook that turns each submitted token into a TokenRecord as it is parsed."""
+    return TokenRecord.from_dict(obj) if "token_metadata" in obj else obj
+
+
+def history_object_hook(obj: Dict[str, Any]) -> Any:
+    """json object_hook that keeps only the key of each historical token."""
+    return TokenRecord.key_only(obj) if "token_metadata" in obj else obj
+
+
+def record_to_json(value: Any) -> Dict[str, Any]:
+    """json.dumps default= hook for lists that contain records."""
+    if isinstance(value, TokenRecord):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
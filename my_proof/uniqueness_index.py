@@ -0,0 +1,136 @@
+import hashlib
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from my_proof.deadline import DEADLINE_CHECK_INTERVAL, Deadline
+from my_proof.near_duplicates import TextSimilarityIndex, graded_uniqueness
+from my_proof.token_record import TokenKey, TokenRecord, as_record
+
+Token = Union[TokenRecord, Dict[str, Any]]
+
+
+def token_key(token: Token) -> TokenKey:
+    """Return the normalized (chain, contract) key used for uniqueness checks."""
+    if isinstance(token, TokenRecord):
+        return token.key
+    token_metadata = token.get("token_metadata") or {}
+    return TokenRecord(token_metadata.get("chain") or "", token_metadata.get("contract") or "").key
+
+
+def compact_token(token: Dict[str, Any]) -> TokenRecord:
+    """Reduce a historical token to the fields needed to rebuild its key."""
+    return TokenRecord.key_only(token)
+
+
+def flatten_tokens(json_data: Iterable[Dict[str, Any]]) -> List[Token]:
+    """Flatten submission entries ({"tokens": [...]}) into a single list of tokens."""
+    return [token for entry in json_data for token in entry.get("tokens", [])]
+
+
+def submission_digest(author: str, tokens: Iterable[Token]) -> str:
+    """Stable id of a submission, from its author and token keys, for runs that are not given a file id."""
+    digest = hashlib.sha256((author or "").lower().encode("utf-8"))
+    for chain, contract in map(token_key, tokens):
+        digest.update(f"\x1e{chain}\x1f{contract}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class UniquenessIndex:
+    """
+    Hash index of every (chain, contract) already seen in the wallet history.
+
+    Built once per run and shared by the uniqueness and scoring stages so both
+    answer membership in O(1) and agree on which submitted tokens are unique.
+    When a global token index is given, keys accepted in any earlier proof
+    count as seen too, except those submission_id itself recorded. The analysis-text signatures of the history are
+    indexed alongside the keys to grade near-duplicate submissions.
+    """
+
+    def __init__(self, historical_tokens: Iterable[Token] = (), global_index=None, submission_id: Optional[str] = None):
+        self._keys = set()
+        self.global_index = global_index
+        self.submission_id = submission_id
+        self.text_index = TextSimilarityIndex()
+        self.add_all(historical_tokens)
+
+    @classmethod
+    def from_json_data(cls, json_data: Iterable[Dict[str, Any]]) -> "UniquenessIndex":
+        """Build the index from a list of submission entries."""
+        return cls(flatten_tokens(json_data))
+
+    def add(self, token: Token) -> None:
+        self._keys.add(token_key(token))
+        if isinstance(token, TokenRecord):
+            self.text_index.add(token.signature)
+
+    def add_all(self, tokens: Iterable[Token]) -> None:
+        for token in tokens:
+            self.add(token)
+
+    def __contains__(self, token: Token) -> bool:
+        key = token_key(token)
+        return key in self._keys or (self.global_index is not None and self.global_index.contains_many([key], self.submission_id)[0])
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def unique_mask(self, tokens: List[Token]) -> List[bool]:
+        """
+        Flag each submitted token as unique or not.
+
+        A token is unique when its key is absent from the history and it is the
+        first occurrence of that key within the submission itself.
+        """
+        keys = [token_key(token) for token in tokens]
+        if self.global_index is not None:
+            seen_globally = self.global_index.contains_many(keys, self.submission_id)
+        else:
+            seen_globally = [False] * len(keys)
+
+        seen_in_submission = set()
+        mask = []
+        for key, is_global in zip(keys, seen_globally):
+            mask.append(not is_global and key not in self._keys and key not in seen_in_submission)
+            seen_in_submission.add(key)
+
+        duplicates = len(tokens) - len(seen_in_submission)
+        if duplicates:
+            logging.info(f"Found {duplicates} duplicate tokens within the submission")
+        return mask
+
+    def uniqueness_scores(self, tokens: List[Token], deadline: Optional[Deadline] = None) -> List[float]:
+        """
+        Graded uniqueness of each submitted token.
+
+        Tokens that are not unique by key score 0.0. Unique tokens score 1.0
+        unless their analysis text nearly matches the history or an earlier
+        token of the same submission, falling to 0.0 for a verbatim copy.
+        If the deadline passes, only the tokens scored so far get a score.
+        """
+        records = [as_record(token) for token in tokens]
+        submission_index = TextSimilarityIndex(self.text_index.bands, self.text_index.threshold)
+        scores = []
+        near_duplicates = 0
+        for position, (record, is_unique) in enumerate(zip(records, self.unique_mask(records))):
+            if deadline is not None and position % DEADLINE_CHECK_INTERVAL == 0 and deadline.expired():
+                deadline.skip("tokens", len(records) - position)
+                logging.warning(f"Deadline reached with {len(records) - position} of {len(records)} tokens not scored")
+                break
+            similarity = max(self.text_index.max_similarity(record.signature), submission_index.max_similarity(record.signature))
+            submission_index.add(record.signature)
+            score = graded_uniqueness(similarity, self.text_index.threshold) if is_unique else 0.0
+            if is_unique and score < 1.0:
+                near_duplicates += 1
+            scores.append(score)
+
+        if near_duplicates:
+            logging.info(f"Found {near_duplicates} tokens whose analysis text nearly duplicates another token")
+        return scores
+
+    def record_accepted(self, keys: Iterable[TokenKey]) -> int:
+        """Append the keys of rewarded tokens to the global index; returns how many were new."""
+        if self.global_index is None:
+            return 0
+        added = self.global_index.add_many(keys, self.submission_id)
+        logging.info(f"Recorded {added} new tokens in the global token index ({len(self.global_index)} total)")
+        return added
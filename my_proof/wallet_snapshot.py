@@ -0,0 +1,170 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from my_proof.file_lock import directory_lock
+from my_proof.token_record import TokenRecord, history_object_hook, record_to_json
+
+# Directory of per-wallet history snapshots, e.g. under /sealed; unset disables them
+WALLET_SNAPSHOT_DIR = os.environ.get("WALLET_SNAPSHOT_DIR")
+# Appended deltas are merged into the wallet's base file once its log holds this many
+WALLET_SNAPSHOT_LOG_LIMIT = int(os.environ.get("WALLET_SNAPSHOT_LOG_LIMIT", 32))
+
+# Bump when the snapshot format or the stored token fields change so old snapshots are rebuilt
+SNAPSHOT_VERSION = 1
+
+
+class WalletSnapshot:
+    """
+    Everything already learned from one wallet's historical files.
+
+    Holds the fileIds processed so far and the distinct history tokens they
+    contained (key and text signature), so a proof only downloads and
+    decrypts the files added since. Each wallet has a base JSON file and an
+    append-only log with one line per save, holding just the files and tokens
+    that save added, so a save costs the size of the delta. The log is merged
+    into the base once it reaches log_limit lines. Writers serialize on a
+    lock file shared by the directory.
+    """
+
+    def __init__(self, snapshot_dir: str, wallet_address: str, log_limit: int = WALLET_SNAPSHOT_LOG_LIMIT):
+        self.snapshot_dir = snapshot_dir
+        self.wallet_address = wallet_address.lower()
+        self.log_limit = log_limit
+        self._reset()
+        self._load()
+
+    def _reset(self) -> None:
+        self.file_ids = set()
+        self.tokens: List[TokenRecord] = []
+        self._seen = set()
+        self._log_entries = 0
+        # Set when the base file is unusable; the next save rewrites it instead of appending
+        self._base_stale = False
+        self._new_file_ids = set()
+        self._new_tokens: List[TokenRecord] = []
+
+    @property
+    def path(self) -> str:
+        name = hashlib.sha256(self.wallet_address.encode("utf-8")).hexdigest()
+        return os.path.join(self.snapshot_dir, f"{name}.json")
+
+    @property
+    def log_path(self) -> str:
+        return self.path[:-len(".json")] + ".log"
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                stored = json.load(f, object_hook=history_object_hook)
+        except FileNotFoundError:
+            stored = {"version": SNAPSHOT_VERSION, "wallet": self.wallet_address, "file_ids": [], "tokens": []}
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable history snapshot for {self.wallet_address}: {e}")
+            self._base_stale = True
+            return
+        if stored.get("version") != SNAPSHOT_VERSION or stored.get("wallet") != self.wallet_address:
+            logging.info(f"Rebuilding history snapshot for {self.wallet_address} (version {stored.get('version')})")
+            self._base_stale = True
+            return
+        self.file_ids.update(stored["file_ids"])
+        self._add_tokens(stored["tokens"])
+
+        try:
+            with open(self.log_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        delta = json.loads(line, object_hook=history_object_hook)
+                    except ValueError:
+                        # An append cut short by a crash; the files it named are fetched again
+                        continue
+                    self.file_ids.update(delta["file_ids"])
+                    self._add_tokens(delta["tokens"])
+                    self._log_entries += 1
+        except FileNotFoundError:
+            pass
+
+    def _add_tokens(self, tokens: Iterable[TokenRecord]) -> List[TokenRecord]:
+        added = []
+        for token in tokens:
+            # A token resubmitted with the same text adds nothing to uniqueness or near-duplicate checks
+            identity = (token.key, token.signature)
+            if identity not in self._seen:
+                self._seen.add(identity)
+                self.tokens.append(token)
+                added.append(token)
+        return added
+
+    def pending(self, file_mappings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """The file mappings not yet in the snapshot."""
+        return [file_info for file_info in file_mappings if file_info.get("fileId") not in self.file_ids]
+
+    def add(self, file_id, json_data_list: List[Dict[str, Any]]) -> None:
+        """Fold one processed file into the snapshot; call save() to persist."""
+        if file_id is None:
+            return
+        self.file_ids.add(file_id)
+        self._new_file_ids.add(file_id)
+        self._new_tokens.extend(self._add_tokens(token for entry in json_data_list for token in entry.get("tokens", [])))
+
+    def save(self) -> None:
+        """Append the files and tokens added since the last save, merging the log into the base when it is full."""
+        if not self._new_file_ids:
+            return
+        new_files = len(self._new_file_ids)
+        with directory_lock(self.snapshot_dir):
+            if self._base_stale:
+                # Nothing on disk was usable, so what this proof fetched is the whole snapshot
+                self._write_base()
+            else:
+                delta = {"file_ids": sorted(self._new_file_ids, key=str), "tokens": self._new_tokens}
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(delta, separators=(",", ":"), default=record_to_json) + "\n")
+                self._log_entries += 1
+                self._new_file_ids = set()
+                self._new_tokens = []
+                if self._log_entries >= self.log_limit:
+                    # Reload so deltas other proofs of this wallet appended are kept
+                    self._reset()
+                    self._load()
+                    self._write_base()
+        logging.info(f"History snapshot for {self.wallet_address} now covers {len(self.file_ids)} files "
+                     f"({new_files} new, {len(self.tokens)} tokens)")
+
+    def _write_base(self) -> None:
+        """Replace the base file with the snapshot as held in memory and drop the log; called with the lock held."""
+        payload = {
+            "version": SNAPSHOT_VERSION,
+            "wallet": self.wallet_address,
+            "updated": time.time(),
+            "file_ids": sorted(self.file_ids, key=str),
+            "tokens": self.tokens,
+        }
+        fd, temp_path = tempfile.mkstemp(dir=self.snapshot_dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(payload, f, separators=(",", ":"), default=record_to_json)
+        os.replace(temp_path, self.path)
+        try:
+            os.remove(self.log_path)
+        except FileNotFoundError:
+            pass
+        self._log_entries = 0
+        self._base_stale = False
+        self._new_file_ids = set()
+        self._new_tokens = []
+
+
+def open_wallet_snapshot(wallet_address: str, snapshot_dir: Optional[str] = WALLET_SNAPSHOT_DIR) -> Optional[WalletSnapshot]:
+    """Load the configured snapshot of wallet_address, or return None when snapshots are disabled or unusable."""
+    if not snapshot_dir or not wallet_address:
+        return None
+    try:
+        os.makedirs(snapshot_dir, exist_ok=True)
+        return WalletSnapshot(snapshot_dir, wallet_address)
+    except OSError as e:
+        logging.warning(f"History snapshots unavailable, fetching the full history: {e}")
+        return None
@@ -0,0 +1,101 @@
+import io
+import json
+import struct
+import zipfile
+
+import pytest
+
+from my_proof import input_manifest
+from my_proof.input_manifest import InputManifest, open_archive
+
+
+def make_zip(members, compression=zipfile.ZIP_DEFLATED):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression) as zip_ref:
+        for name, data in members.items():
+            if name.endswith("/"):
+                zip_ref.mkdir(name)
+            else:
+                zip_ref.writestr(name, data)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    def set_limits(members, uncompressed_bytes):
+        monkeypatch.setattr(input_manifest, "INPUT_MAX_ARCHIVE_MEMBERS", members)
+        monkeypatch.setattr(input_manifest, "INPUT_MAX_UNCOMPRESSED_BYTES", uncompressed_bytes)
+    return set_limits
+
+
+def test_archive_within_limits_opens(limits):
+    limits(members=2, uncompressed_bytes=10)
+    with open_archive(io.BytesIO(make_zip({"a.json": b"12345", "b.txt": b"12345"}))) as zip_ref:
+        assert zip_ref.read("a.json") == b"12345"
+
+
+def test_too_many_members(limits):
+    limits(members=2, uncompressed_bytes=1000)
+    data = make_zip({"a": b"", "b": b"", "c": b""})
+    with pytest.raises(ValueError, match="3 members"):
+        open_archive(io.BytesIO(data), "upload.zip")
+
+
+def test_directories_do_not_count_as_members(limits):
+    limits(members=1, uncompressed_bytes=1000)
+    with open_archive(io.BytesIO(make_zip({"nested/": b"", "deeper/": b"", "a.json": b"[]"}))) as zip_ref:
+        assert len(zip_ref.infolist()) == 3
+
+
+def test_uncompressed_size_over_limit(limits):
+    # A megabyte of zeros compresses to about a kilobyte; the limit applies to the expanded size
+    limits(members=10, uncompressed_bytes=1024 * 1024 - 1)
+    data = make_zip({"bomb.json": bytes(1024 * 1024)})
+    assert len(data) < 10 * 1024
+    with pytest.raises(ValueError, match="expands to 1048576 bytes"):
+        open_archive(io.BytesIO(data))
+
+
+def test_sizes_are_summed_across_members(limits):
+    limits(members=10, uncompressed_bytes=9)
+    with pytest.raises(ValueError, match="expands to 10 bytes"):
+        open_archive(io.BytesIO(make_zip({"a": b"12345", "b": b"12345"})))
+
+
+def test_member_cannot_expand_past_its_declared_size(limits):
+    limits(members=10, uncompressed_bytes=100)
+    data = bytearray(make_zip({"a.json": bytes(100_000)}))
+    # Understate the size in the central directory, which is what the limit is checked against
+    central = data.index(b"PK\x01\x02")
+    struct.pack_into("<I", data, central + 24, 10)
+
+    with open_archive(io.BytesIO(bytes(data))) as zip_ref:
+        with zip_ref.open("a.json") as file:
+            try:
+                read = file.read()
+            except zipfile.BadZipFile:
+                read = b""
+    assert len(read) <= 10
+
+
+@pytest.mark.parametrize("data", [b"", b"not a zip", make_zip({"a": b"1"})[:-10]])
+def test_invalid_archive_raises_value_error(data):
+    with pytest.raises(ValueError, match="Invalid ZIP archive upload.zip"):
+        open_archive(io.BytesIO(data), "upload.zip")
+
+
+def test_manifest_reads_top_level_members_in_place():
+    data = make_zip({
+        "tokenInput.json": json.dumps({"tokens": [], "userAddress": "0x1"}).encode(),
+        "params.txt": b"author: 0xabc\n",
+        "nested/other.json": b"{}",
+    })
+    manifest = InputManifest.from_archive_bytes(data)
+    assert manifest.json_documents == [{"tokens": [], "userAddress": "0x1"}]
+    assert manifest.author == "0xabc"
+
+
+def test_manifest_rejects_archive_over_limit(limits):
+    limits(members=1, uncompressed_bytes=1000)
+    with pytest.raises(ValueError, match="submission.zip has 2 members"):
+        InputManifest.from_archive_bytes(make_zip({"a.json": b"{}", "b.json": b"{}"}))
@@ -0,0 +1,107 @@
+import math
+import random
+
+import pytest
+
+from my_proof.proof_of_quality_n_authenticity import (
+    get_risk_status_and_quality,
+    score_metrics_batch,
+    validate_token_metrics,
+)
+
+METRIC_KEYS = ("price", "circulatingSupply", "marketCap", "volatility24h", "riskScore")
+
+
+def score_per_token(metrics_list, validate_list):
+    authenticity_list, quality_list = [], []
+    for metrics, validate in zip(metrics_list, validate_list):
+        authenticity = validate_token_metrics(metrics) if validate else 0
+        authenticity_list.append(authenticity)
+        quality_list.append(get_risk_status_and_quality(metrics.get("riskScore", 0)) * authenticity)
+    return authenticity_list, quality_list
+
+
+def random_value(rng):
+    return rng.choice([
+        lambda: rng.uniform(-10, 110),
+        lambda: rng.uniform(0, 1e12),
+        lambda: rng.randint(-5, 120),
+        lambda: rng.randint(2 ** 53, 2 ** 64),
+        lambda: rng.choice([0, 0.0, -0.0, 3, 5, 8, 10, 3.0, 5.0, 8.0, 10.0, 100, 100.0]),
+        lambda: rng.choice([True, False]),
+        lambda: rng.choice([math.inf, -math.inf, math.nan]),
+        lambda: math.nextafter(rng.choice([3.0, 5.0, 8.0, 10.0, 100.0]), rng.choice([0.0, 200.0])),
+    ])()
+
+
+def random_metrics(rng):
+    price = rng.choice([rng.uniform(1e-6, 1e4), rng.randint(1, 1000), random_value(rng)])
+    supply = rng.choice([rng.uniform(0, 1e10), rng.randint(0, 10 ** 12), random_value(rng)])
+    metrics = {
+        "price": price,
+        "circulatingSupply": supply,
+        "volatility24h": random_value(rng),
+        "riskScore": random_value(rng),
+    }
+    # Near, on and far from the 5% market cap tolerance
+    if isinstance(price, (int, float)) and isinstance(supply, (int, float)) and rng.random() < 0.7:
+        metrics["marketCap"] = price * supply * rng.choice([1, 0.95, 1.05, rng.uniform(0.9, 1.1)])
+    else:
+        metrics["marketCap"] = random_value(rng)
+    if rng.random() < 0.05:
+        del metrics["riskScore"]
+    return metrics
+
+
+def assert_identical(actual, expected):
+    assert len(actual) == len(expected)
+    for got, want in zip(actual, expected):
+        assert type(got) is type(want) and got == want, (got, want)
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_batch_matches_per_token_scoring(seed):
+    rng = random.Random(seed)
+    size = rng.randint(0, 100)
+    metrics_list = [random_metrics(rng) for _ in range(size)]
+    validate_list = [rng.random() < 0.8 for _ in range(size)]
+
+    authenticity, quality = score_metrics_batch(metrics_list, validate_list)
+    expected_authenticity, expected_quality = score_per_token(metrics_list, validate_list)
+
+    assert_identical(authenticity, expected_authenticity)
+    assert_identical(quality, expected_quality)
+
+
+@pytest.mark.parametrize("risk_score, quality", [
+    (0, 1.0), (3, 1.0), (3.5, 0.95), (5, 0.95), (6, 0.85), (8, 0.85), (9, 0.75), (10, 0.75), (11, 1.0), (-1, 1.0),
+])
+def test_risk_buckets(risk_score, quality):
+    metrics = {"price": 2.0, "circulatingSupply": 10.0, "marketCap": 20.0, "volatility24h": 1.0, "riskScore": risk_score}
+    assert score_metrics_batch([metrics], [True]) == ([1.0], [quality])
+
+
+def test_unvalidated_tokens_score_integer_zero():
+    metrics = {"price": 2.0, "circulatingSupply": 10.0, "marketCap": 20.0, "volatility24h": 1.0, "riskScore": 1}
+    authenticity, quality = score_metrics_batch([metrics], [False])
+    assert_identical(authenticity, [0])
+    assert_identical(quality, [0.0])
+
+
+def test_unvalidated_tokens_ignore_missing_metrics():
+    assert score_metrics_batch([{}], [False]) == ([0], [0.0])
+
+
+def test_missing_metric_raises_like_per_token_scoring():
+    metrics = {"price": 2.0, "marketCap": 20.0, "volatility24h": 1.0}
+    with pytest.raises(KeyError):
+        validate_token_metrics(metrics)
+    with pytest.raises(KeyError):
+        score_metrics_batch([metrics], [True])
+
+
+def test_integer_price_and_supply_keep_exact_market_cap():
+    # price * supply is not representable in float64, so only exact integer math gets this right
+    supply = 2 ** 60 + 1
+    metrics = {"price": 3, "circulatingSupply": supply, "marketCap": 3 * supply, "volatility24h": 1, "riskScore": 0}
+    assert score_metrics_batch([metrics], [True]) == score_per_token([metrics], [True])
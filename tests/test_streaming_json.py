@@ -0,0 +1,92 @@
+import io
+import json
+
+import pytest
+
+from my_proof.streaming_json import iter_json_array
+
+
+class CountingStream(io.StringIO):
+    """Records the largest read, to show the parser does not slurp the stream."""
+
+    def __init__(self, text):
+        super().__init__(text)
+        self.largest_read = 0
+
+    def read(self, size=-1):
+        chunk = super().read(size)
+        self.largest_read = max(self.largest_read, len(chunk))
+        return chunk
+
+
+def parse(text, key="tokens", chunk_size=7):
+    return list(iter_json_array(io.StringIO(text), key, chunk_size))
+
+
+DOCUMENTS = [
+    {"tokens": []},
+    {"tokens": [1]},
+    {"tokens": [1, 2.5, -3e-7, 12345678901234567890, True, None, "x"]},
+    {"tokens": [{"a": [1, {"b": "]}[,:"}]}, [], {}, "é中\U0001f600", "esc \" \\ \n"]},
+    {"userAddress": "0xabc", "tokens": [{"token_submitted": "0x1"}], "after": {"tokens": [9]}},
+    {"before": [[[["deep"]]]], "other": {"tokens": [0]}, "tokens": ["only these"]},
+    {"tokens": [{"on_chain_analysis": "y" * 5000}, {"n": 1}]},
+]
+
+
+@pytest.mark.parametrize("document", DOCUMENTS)
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, 1 << 16])
+@pytest.mark.parametrize("indent", [None, 2])
+def test_matches_json_load(document, chunk_size, indent):
+    text = json.dumps(document, indent=indent, ensure_ascii=False)
+    assert parse(text, chunk_size=chunk_size) == document["tokens"]
+
+
+@pytest.mark.parametrize("text", ["{}", " { } ", '{"userAddress": "0x1"}', '{"tokens": {"a": 1}}', '{"tokens": null}'])
+def test_missing_or_non_array_key_yields_nothing(text):
+    assert parse(text) == []
+
+
+def test_numbers_split_across_chunks_are_not_truncated():
+    text = '{"tokens": [1234567, 8.25e10, -0.000125]}'
+    for chunk_size in range(1, len(text) + 1):
+        assert parse(text, chunk_size=chunk_size) == [1234567, 8.25e10, -0.000125]
+
+
+def test_custom_key():
+    assert parse('{"tokens": [1], "history": [2, 3]}', key="history") == [2, 3]
+
+
+def test_reads_in_bounded_chunks():
+    items = [{"on_chain_analysis": "z" * 100} for _ in range(1000)]
+    stream = CountingStream(json.dumps({"tokens": items}))
+    assert list(iter_json_array(stream, chunk_size=256)) == items
+    assert stream.largest_read <= 256
+
+
+def test_items_are_yielded_before_the_stream_ends():
+    stream = io.StringIO('{"tokens": [1, 2, ')
+    items = iter_json_array(stream, chunk_size=4)
+    assert next(items) == 1
+    assert next(items) == 2
+    with pytest.raises(ValueError):
+        next(items)
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    "[]",
+    '{"tokens": [1 2]}',
+    '{"tokens": [1,]}',
+    '{"tokens": [1]',
+    '{"tokens" [1]}',
+    '{"tokens": ["unterminated]}',
+    '{"tokens": [1-2]}',
+])
+def test_malformed_input_raises_value_error(text):
+    with pytest.raises(ValueError):
+        parse(text)
+
+
+def test_stops_reading_at_the_closing_brace():
+    assert parse('{"tokens": [1]} trailing') == [1]